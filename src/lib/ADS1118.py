@@ -1,15 +1,131 @@
 from machine import Pin
+from array import array
 import asyncio
 import json
+import math
+import os
+import time
 from common.logger import *
 
 
+class CalibrationStore:
+    """
+    Calibration offsets and gains of all ADS1118 sharing one calibration file.
+
+    The file is parsed once, on the first attach(). Each converter, keyed by
+    its CS or demux output, gets an array('h') of offsets and an array('f')
+    of gains which the instance uses directly, so calibrating a channel only
+    touches memory. save() writes every converter in one go through a
+    temporary file, so a reset during the write keeps the old file.
+    Entries are {"offset": [...], "gain": [...]}, a plain list of offsets
+    as written by older firmware is accepted as well. Only gains set with
+    ADS1118.set_gain() are stored, other channels hold null and keep the
+    gain passed to the constructor. Converters without offsets or stored
+    gains are left out of the file.
+    """
+    _shared = {}
+
+    @classmethod
+    def shared(cls, cal_file="ads1118_cal.json"):
+        """Return the store of cal_file, created on first use."""
+        store = cls._shared.get(cal_file)
+        if store is None:
+            store = cls(cal_file)
+            cls._shared[cal_file] = store
+        return store
+
+    def __init__(self, cal_file="ads1118_cal.json"):
+        self.log = create_logger("ads1118", level=LogLevel.INFO, syslog=False)
+        self.cal_file = cal_file
+        self._data = None       # parsed file, entries move to _entries on attach
+        self._entries = {}      # key -> (offsets, gains)
+        self.loads = 0
+        self.saves = 0
+
+    def _load(self):
+        self.loads += 1
+        try:
+            with open(self.cal_file, "r") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("not a dict")
+            self._data = data
+        except (OSError, ValueError):
+            self.log.warn("Calibration load failed, using default offsets", ctx="ads1118")
+            self._data = {}
+
+    def attach(self, key, nr_of_ch, gain):
+        """Return (offsets, gains, gain_set) of a converter.
+
+        gain applies to every channel without a stored gain, gain_set flags
+        the channels whose gain is stored.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and len(entry[0]) == nr_of_ch:
+            return entry
+        if self._data is None:
+            self._load()
+        offsets = array('h', [0] * nr_of_ch)
+        gains = array('f', gain)
+        gain_set = bytearray(nr_of_ch)
+        stored = self._data.pop(key, None)
+        if isinstance(stored, list):
+            stored = {"offset": stored}
+        if isinstance(stored, dict):
+            values = stored.get("offset")
+            if isinstance(values, list) and len(values) == nr_of_ch and all(isinstance(o, int) for o in values):
+                for i in range(nr_of_ch):
+                    offsets[i] = values[i]
+            values = stored.get("gain")
+            if isinstance(values, list) and len(values) == nr_of_ch:
+                for i in range(nr_of_ch):
+                    if values[i] is not None:
+                        gains[i] = values[i]
+                        gain_set[i] = 1
+        entry = (offsets, gains, gain_set)
+        self._entries[key] = entry
+        return entry
+
+    def clear(self, key):
+        """Zero the offsets and forget the stored gains of a converter, the next save() drops it from the file."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            offsets, _, gain_set = entry
+            for i in range(len(offsets)):
+                offsets[i] = 0
+                gain_set[i] = 0
+        if self._data is not None:
+            self._data.pop(key, None)
+
+    def save(self):
+        """Write all converters at once, returns False if the write failed."""
+        data = dict(self._data or {})   # entries of converters not attached in this boot
+        for key, (offsets, gains, gain_set) in self._entries.items():
+            if not any(offsets) and not any(gain_set):
+                continue    # defaults only
+            entry = {"offset": list(offsets)}
+            if any(gain_set):
+                entry["gain"] = [round(gains[i], 6) if gain_set[i] else None for i in range(len(gains))]
+            data[key] = entry
+        tmp = self.cal_file + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.rename(tmp, self.cal_file)
+        except OSError as e:
+            self.log.error(f"Calibration save failed: {e}", ctx="ads1118")
+            return False
+        self.saves += 1
+        return True
+
+
 class ADS1118:
     """
     MicroPython library for the ADS1118 16-bit ADC, supporting either SN74HC154 demultiplexer
     or single CS pin for chip selection, optimized for single-shot conversions with asynchronous reads.
     VCC is either 3.3V or %V. Accepts an existing SPI instance.
-    Calibration offsets are stored persistently in a JSON file and loaded at initialization.
+    Calibration offsets are stored persistently in a JSON file, shared by all instances through
+    a CalibrationStore which parses it once.
     """
  
     # FSR positive values based on PGA, VCC=5V
@@ -32,6 +148,9 @@ class ADS1118:
         gain = [1.0, 1.0, 1.0, 1.0],
         pull_up_en=1,
         cal_file="ads1118_cal.json",
+        mode="single",
+        drdy=None,
+        cal_store=None,
     ):
         """
         Initialize the ADS1118 with an SPI instance and either a demultiplexer or a single CS pin.
@@ -46,6 +165,10 @@ class ADS1118:
         :param channel_mux: mux settings to be used on ADS1118 e.g. mux = {0: 0b111, 1: 0b110, 2: 0b101, 3: 0b100}
         :param pull_up_en: Enable pull-up on DOUT/DRDY (0 or 1).
         :param cal_file: File path for storing/loading calibration offsets.
+        :param cal_store: CalibrationStore to use instead of the shared store of cal_file.
+        :param mode: "single" for single-shot or "continuous" conversions.
+        :param drdy: machine.Pin input on the SPI MISO line, DOUT/DRDY goes low while CS is
+                     asserted once a result is ready. Without it reads wait a fixed delay.
         """
         self.log = create_logger("ads1118", level=LogLevel.INFO, syslog=False)
         if (demux is None and cs_pin is None) or (
@@ -68,6 +191,8 @@ class ADS1118:
             raise ValueError("Channel MUX must be provided and contain 1-8 entries")
         if vcc != 3.3 and vcc != 5.0:
             raise ValueError("Only VCC of 3.3V or 5V is supported ",vcc)
+        if mode not in ("single", "continuous"):
+            raise ValueError("Mode must be 'single' or 'continuous'")
         if gain is None or len(gain) != len(channel_mux):
             raise ValueError("Gain list must match number of channels in channel_mux")
         for g in gain:
@@ -83,50 +208,39 @@ class ADS1118:
         self.nr_of_ch = len(channel_mux)
         self.pull_up_en = pull_up_en
         self.cal_file = cal_file
-        self.offset = [0, 0, 0, 0]  # Signed offsets for channels 0, 1,2,3
-        self.gain = gain  # Gain correction factors for channels 0,1,2,3
+        self.cal_store = cal_store if cal_store is not None else CalibrationStore.shared(cal_file)
+        self.offset = None  # Signed offsets per channel, array from the cal_store
+        self.gain = gain  # Gain correction factors per channel, array from the cal_store
+        self._gain = list(gain)     # constructor gains, used where set_gain() stored none
+        self._gain_set = None       # 1 = gain set with set_gain(), array from the cal_store
         self.frs = self._FSR_5V if vcc == 5.0 else self._FSR
+        self.continuous = mode == "continuous"
+        self.drdy = drdy
+        self._cont_words = None     # config the continuous conversions run with
+        self._tx = bytearray(2)
+        self._rx = bytearray(2)
+        self._discard = False       # next result still belongs to the previous input
+        self._started_us = 0
+        self._result_us = 0         # ticks_us of the last result read
+        self.oversampling = bytearray(b"\x01" * self.nr_of_ch)   # conversions per result
+        self._median = bytearray(self.nr_of_ch)                   # 1 = median of 3 before averaging
+        self._acc = array('l', [0] * self.nr_of_ch)
+        self._count = bytearray(self.nr_of_ch)
+        self._hist = array('l', [0] * (2 * self.nr_of_ch))       # first two of each group of 3
+        self.reset_latency_stats()
         self._load_calibration()
+        self._update_configs()
+
+    def _cal_key(self):
+        return str(self.cs_pin) if self.cs_pin is not None else str(self.demux_output)
 
     def _load_calibration(self):
-        """Load calibration offsets from file, if available."""
-        try:
-            with open(self.cal_file, "r") as f:
-                data = json.load(f)
-                key = (
-                    str(self.cs_pin)
-                    if self.cs_pin is not None
-                    else str(self.demux_output)
-                )
-                if key in data:
-                    offsets = data[key]
-                    if (
-                        isinstance(offsets, list)
-                        and len(offsets) == self.nr_of_ch
-                        and all(isinstance(o, int) for o in offsets)
-                    ):
-                        self.offset = offsets
-        except (OSError, ValueError):
-            self.log.warn("Calibration load failed, using default offsets", ctx="ads1118")
-            # File missing, corrupted, or invalid; keep default offsets [0, 0]
-            pass
+        """Attach to the calibration store, missing entries keep zero offsets."""
+        self.offset, self.gain, self._gain_set = self.cal_store.attach(self._cal_key(), self.nr_of_ch, self._gain)
 
     def _save_calibration(self):
-        """Save calibration offsets to file."""
-        try:
-            try:
-                with open(self.cal_file, "r") as f:
-                    data = json.load(f)
-            except (OSError, ValueError):
-                data = {}
-            key = (
-                str(self.cs_pin) if self.cs_pin is not None else str(self.demux_output)
-            )
-            data[key] = self.offset
-            with open(self.cal_file, "w") as f:
-                json.dump(data, f)
-        except OSError as e:
-            self.log.error(f"Calibration save failed: {e}", ctx="ads1118")
+        """Save the calibration of all instances sharing the store."""
+        self.cal_store.save()
 
     def validate_calibration(self, max_offset=1000):
         """
@@ -138,33 +252,41 @@ class ADS1118:
         return all(abs(offset) <= max_offset for offset in self.offset)
 
     def clear_calibration(self):
-        """Reset offsets to zero and remove from file."""
-        self.offset = [0, 0, 0, 0]
-        try:
-            with open(self.cal_file, "r") as f:
-                data = json.load(f)
-            key = (
-                str(self.cs_pin) if self.cs_pin is not None else str(self.demux_output)
-            )
-            if key in data:
-                del data[key]
-                with open(self.cal_file, "w") as f:
-                    json.dump(data, f)
-        except (OSError, ValueError):
-            self.log.warn("Calibration save failed, using default offsets", ctx="ads1118")
-            pass
+        """Reset offsets to zero, gains to the constructor values and remove from file."""
+        self.cal_store.clear(self._cal_key())
+        for i in range(self.nr_of_ch):
+            self.gain[i] = self._gain[i]
+        self._update_configs()
+        self._save_calibration()
+
+    def set_gain(self, channel, gain):
+        """Set the gain correction of a channel, saved with the calibration and preferred over the constructor gain."""
+        if gain <= -2.0 or gain >= 2.0:
+            raise ValueError("Gain correction factors must be positive")
+        self.gain[channel] = gain
+        self._gain_set[channel] = 1
+        self._update_configs()
 
     def set_pga(self, pga):
         """Set the PGA (gain)."""
         if pga < 0 or pga > 7:
             raise ValueError("PGA must be between 0 and 7")
         self.pga = pga
+        self._update_configs()
 
     def set_data_rate(self, dr):
         """Set the data rate."""
         if dr < 0 or dr > 7:
             raise ValueError("DR must be between 0 and 7")
         self.dr = dr
+        self._update_configs()
+
+    def set_mode(self, mode):
+        """Select "single" (single-shot) or "continuous" conversions, applied on the next read."""
+        if mode not in ("single", "continuous"):
+            raise ValueError("Mode must be 'single' or 'continuous'")
+        self.continuous = mode == "continuous"
+        self._update_configs()
 
     def _build_config(self, ss, mux, ts):
         """Build the 16-bit config register value."""
@@ -172,7 +294,7 @@ class ADS1118:
             (ss << 15)
             | (mux << 12)
             | (self.pga << 9)
-            | (1 << 8)  # Mode=1 (single-shot)
+            | ((0 if self.continuous else 1) << 8)  # Mode=1 (single-shot), 0 (continuous)
             | (self.dr << 5)
             | (ts << 4)
             | (self.pull_up_en << 3)
@@ -181,26 +303,72 @@ class ADS1118:
         )
         return config
 
-    def _write_and_read(self, config):
-        """Perform SPI transaction: write config, read conversion result."""
+    def _config_words(self, ss, mux, ts):
+        config = self._build_config(ss, mux, ts)
+        return bytes((config >> 8, config & 0xFF))
+
+    def _update_configs(self):
+        """
+        Precompute the config words and conversion constants of every channel.
+
+        Called whenever PGA, data rate, mode or the gains change, so a
+        conversion is one SPI transfer of a ready word plus integer math.
+        Offsets are read from the calibration arrays on every conversion.
+        """
+        self._start_words = [self._config_words(1, self.channel_mux[ch], 0) for ch in range(self.nr_of_ch)]
+        self._read_words = [self._config_words(0, self.channel_mux[ch], 0) for ch in range(self.nr_of_ch)]
+        self._temp_words = (self._config_words(1, 0, 1), self._config_words(0, 0, 1))
+        self._signed = bytearray(0 if self.channel_mux[ch] >= 4 else 1 for ch in range(self.nr_of_ch))
+        self._scale = array('f', [self._get_lsb(self._signed[ch]) * self.gain[ch] for ch in range(self.nr_of_ch)])
+        self._cont_words = None
+
+    def _select(self):
         if self.demux is not None:
             self.demux.select(self.demux_output)
         elif self.cs_pin is not None:
             self.cs_pin.value(0)  # Active-low CS
-        conf_bytes = bytearray([(config >> 8) & 0xFF, config & 0xFF])
-        read_bytes = bytearray(2)
-        self.spi.write_readinto(conf_bytes, read_bytes)
+
+    def _deselect(self):
         if self.demux is not None:
             self.demux.deselect()
         elif self.cs_pin is not None:
             self.cs_pin.value(1)  # Deactivate CS
-        return (read_bytes[0] << 8) | read_bytes[1]
+
+    def _transfer(self, words):
+        """Perform SPI transaction: write config words, read conversion result."""
+        self._select()
+        self.spi.write_readinto(words, self._rx)
+        self._deselect()
+        return (self._rx[0] << 8) | self._rx[1]
+
+    def _write_and_read(self, config):
+        """Perform SPI transaction: write config, read conversion result."""
+        self._tx[0] = (config >> 8) & 0xFF
+        self._tx[1] = config & 0xFF
+        return self._transfer(self._tx)
+
+    def data_ready(self):
+        """Poll DOUT/DRDY once, True if a new result can be read."""
+        self._select()
+        ready = self.drdy.value() == 0
+        self._deselect()
+        return ready
 
     def _start_conversion(self, channel, ts):
-        """Start a single-shot conversion by writing config with SS=1."""
-        mux = self.channel_mux[channel] if ts == 0 else 0
-        config = self._build_config(1, mux, ts)
-        return self._write_and_read(config)  # Ignore returned data
+        """Start a single-shot conversion by writing config with SS=1.
+
+        In continuous mode the config is only written when the input changes,
+        the result converting at that moment still belongs to the old input.
+        """
+        self._started_us = time.ticks_us()
+        if self.continuous:
+            words = self._temp_words[1] if ts else self._read_words[channel]
+            if words is self._cont_words:
+                return None
+            self._cont_words = words
+            self._discard = True
+            return self._transfer(words)
+        return self._transfer(self._temp_words[0] if ts else self._start_words[channel])  # Ignore returned data
 
     def _conversion_delay(self):
         """Return delay time in seconds for single-shot conversion."""
@@ -209,13 +377,85 @@ class ADS1118:
     def get_conversion_delay(self):
         return self._conversion_delay()
     
+    async def _wait_ready(self, since_us):
+        """
+        Wait for the result of a conversion started at ticks_us since_us.
+
+        With a DRDY pin this sleeps through most of a nominal conversion and
+        then polls, yielding to other tasks between polls. Without one the
+        fixed conversion delay is slept. If DRDY does not go low in time the
+        rest of the fixed delay is slept and the result is read anyway.
+        """
+        if self.drdy is None:
+            await asyncio.sleep(self._conversion_delay())
+            return
+        conv_us = 1000000 // self._DR_SPS[self.dr]
+        rest = conv_us * 9 // 10 - time.ticks_diff(time.ticks_us(), since_us)
+        if rest >= 1000:
+            await asyncio.sleep_ms(rest // 1000)
+        timeout = 2 * conv_us + 2000
+        while not self.data_ready():
+            self._polls += 1
+            waited = time.ticks_diff(time.ticks_us(), since_us)
+            if waited > timeout:
+                self._drdy_timeouts += 1
+                self.log.warn("DRDY timeout, reading after the fixed delay", ctx="ads1118")
+                rest = int(self._conversion_delay() * 1000000) - waited
+                if rest >= 1000:
+                    await asyncio.sleep_ms(rest // 1000)
+                return
+            await asyncio.sleep_ms(0)
+
     async def _read_raw(self, channel, ts, sleep = True):
-        """Read raw 16-bit conversion result after async delay."""
-        mux = self.channel_mux[channel] if ts == 0 else 0
-        config = self._build_config(0, mux, ts)
+        """Read raw 16-bit conversion result once it is ready."""
+        words = self._temp_words[1] if ts else self._read_words[channel]
         if sleep :
-            await asyncio.sleep(self._conversion_delay())
-        return self._write_and_read(config)
+            if self.continuous and not self._discard:
+                # the next result follows the previous one by one conversion
+                await self._wait_ready(self._result_us)
+            else:
+                await self._wait_ready(self._started_us)
+            if self._discard:
+                # continuous mode switched input: drop the result of the old one
+                self._discard = False
+                self._transfer(words)
+                await self._wait_ready(time.ticks_us())
+        raw = self._transfer(words)
+        if sleep:
+            self._result_us = time.ticks_us()
+            self._record_latency(time.ticks_diff(self._result_us, self._started_us))
+        return raw
+
+    def _record_latency(self, us):
+        self._reads += 1
+        self._latency_sum += us
+        if us < self._latency_min:
+            self._latency_min = us
+        if us > self._latency_max:
+            self._latency_max = us
+
+    def latency_stats(self):
+        """Read latency from conversion request to result since reset_latency_stats()."""
+        reads = self._reads
+        return {
+            "mode": "continuous" if self.continuous else "single",
+            "sps": self._DR_SPS[self.dr],
+            "drdy": self.drdy is not None,
+            "reads": reads,
+            "avg_us": self._latency_sum // reads if reads else 0,
+            "min_us": self._latency_min if reads else 0,
+            "max_us": self._latency_max,
+            "polls": self._polls,
+            "drdy_timeouts": self._drdy_timeouts,
+        }
+
+    def reset_latency_stats(self):
+        self._reads = 0
+        self._latency_sum = 0
+        self._latency_min = 0x7FFFFFFF
+        self._latency_max = 0
+        self._polls = 0
+        self._drdy_timeouts = 0
 
     def _get_value(self, raw, signed):
         if signed:
@@ -238,18 +478,21 @@ class ADS1118:
         else:
             return fsr / 65536  # 16-bit resolution for differential
 
-    async def calibrate(self, channel):
+    async def calibrate(self, channel, save=True):
         """
         Calibrate zero point for the channel (stores offset persistently).
 
         :param channel: Channel (0 or 1).
+        :param save: Write the calibration file right away. Pass False when calibrating
+                     several channels and call cal_store.save() once at the end.
         """
         if channel < 0 or channel > self.nr_of_ch:
             raise ValueError(f"Channel must be 0 to {self.nr_of_ch}")
         self._start_conversion(channel, 0)
         signed = await self._read(channel, 0)
         self.offset[channel] = signed
-        self._save_calibration()
+        if save:
+            self._save_calibration()
 
     async def _read(self, channel, ts=0, sleep = True):
         """Read signed conversion value."""
@@ -258,16 +501,91 @@ class ADS1118:
         signed = (False if mux >= 4 else True)
         return self._get_value(raw, signed)
 
+    def _code(self, channel, raw):
+        if self._signed[channel]:
+            return raw - 0x10000 if raw & 0x8000 else raw
+        return raw & 0x7FFF
+
+    def raw_to_voltage(self, channel, raw):
+        """Convert a raw conversion result of channel to volts, offset and gain corrected."""
+        return (self._code(channel, raw) - self.offset[channel]) * self._scale[channel]
+
+    def set_oversampling(self, channel, n=1, median=False):
+        """
+        Decimate n conversions into one result of channel.
+
+        Conversions are summed as integers and converted once per result.
+        With median=True every group of 3 conversions is first reduced to its
+        median, which rejects single spikes, so n must be a multiple of 3.
+        Raise the data rate with set_data_rate() to keep the latency.
+        """
+        if n < 1 or n > 255:
+            raise ValueError("Oversampling must be between 1 and 255")
+        if median and n % 3:
+            raise ValueError("Median of 3 needs a multiple of 3 conversions")
+        self.oversampling[channel] = n
+        self._median[channel] = 1 if median else 0
+        self.reset_accumulator(channel)
+
+    def reset_accumulator(self, channel=None):
+        """Drop partially collected results of one or all channels."""
+        for ch in range(self.nr_of_ch) if channel is None else (channel,):
+            self._acc[ch] = 0
+            self._count[ch] = 0
+
+    def accumulate(self, channel, raw):
+        """Add one raw conversion of channel, returns the voltage once n are collected, else None."""
+        code = self._code(channel, raw)
+        count = self._count[channel] + 1
+        if self._median[channel]:
+            slot = count % 3
+            if slot:
+                self._hist[2 * channel + slot - 1] = code
+            else:
+                a = self._hist[2 * channel]
+                b = self._hist[2 * channel + 1]
+                self._acc[channel] += max(min(a, b), min(max(a, b), code))
+        else:
+            self._acc[channel] += code
+        if count < self.oversampling[channel]:
+            self._count[channel] = count
+            return None
+        acc = self._acc[channel]
+        self._acc[channel] = 0
+        self._count[channel] = 0
+        n = count // 3 if self._median[channel] else count
+        return (acc / n - self.offset[channel]) * self._scale[channel]
+
+    def oversampling_info(self, channel):
+        """
+        Expected resolution and latency of the oversampling setting of channel.
+
+        Assumes white noise of at least one LSB at the input, so averaging
+        lowers it by sqrt(n_eff). A median of 3 is worth about 2.2 averaged
+        conversions. latency_ms is the conversion time of one result.
+        """
+        n = self.oversampling[channel]
+        n_eff = n * 0.742 if self._median[channel] else n
+        sps = self._DR_SPS[self.dr]
+        return {
+            "n": n,
+            "median": bool(self._median[channel]),
+            "sps": sps,
+            "latency_ms": n * 1000 / sps,
+            "resolution_uv": self._scale[channel] * 1e6 / math.sqrt(n_eff),
+            "enob": 16 + 0.5 * math.log(n_eff) / math.log(2),
+        }
+
     async def read_voltage(self, channel):
-        """Read voltage in single-shot mode."""
+        """Read voltage in single-shot mode, decimated as set by set_oversampling()."""
         if channel < 0 or channel > self.nr_of_ch:
             raise ValueError(f"Channel must be 0 to {self.nr_of_ch}")
-        self._start_conversion(channel, 0)
-        vol = await self._read(channel, ts = 0, sleep = True) - self.offset[channel]
-        mux = self.channel_mux[channel]
-        signed = (False if mux >= 4 else True)
-        voltage = vol * self._get_lsb(signed)
-        return voltage
+        self.reset_accumulator(channel)
+        while True:
+            self._start_conversion(channel, 0)
+            voltage = self.accumulate(channel, await self._read_raw(channel, 0))
+            if voltage is not None:
+                return voltage
 
     async def read_temperature(self):
         """Read internal temperature sensor (single-shot)."""
@@ -281,21 +599,148 @@ class ADS1118:
         """Read all voltages helper. this function requires to call start_conversions_all first !!!!"""
         if channel < 0 or channel > self.nr_of_ch:
             raise ValueError(f"Channel must be 0 to {self.nr_of_ch}")
-        vol = await self._read(channel, ts=0, sleep = False) - self.offset[channel]
-        mux = self.channel_mux[channel]
-        signed = (False if mux >= 4 else True)
-        voltage = vol * self._get_lsb(signed)
-        return voltage
+        return self.raw_to_voltage(channel, await self._read_raw(channel, 0, sleep = False))
 
     async def start_conversions_all(self, channel, ret = False):
         if channel < 0 or channel > self.nr_of_ch:
             raise ValueError(f"Channel must be 0 to {self.nr_of_ch}")
         if ret:
-            vol = self._get_signed(self._start_conversion(channel, 0))- self.offset[channel]
-            mux = self.channel_mux[channel]
-            signed = (False if mux >= 4 else True)
-            return vol * self._get_lsb(signed)
+            # the data clocked out while starting is the previous conversion
+            return self.raw_to_voltage(channel, self._start_conversion(channel, 0))
         else:
             self._start_conversion(channel, 0)
 
 
+class ADS1118Scanner:
+    """
+    Pipelined round-robin scan over several ADS1118 sharing one SPI bus.
+
+    Every CS cycle of a converter clocks out the result of its previous
+    conversion while the same config write starts the next channel, so all
+    converters convert in parallel and the bus only waits one conversion time
+    per round. A channel set to oversample with ADS1118.set_oversampling()
+    is started as many times in a row as it decimates. A sweep is as many
+    rounds as the converter with the most conversions per cycle needs, the
+    others keep cycling through their channels. Results are written to
+    voltages, indexed by the channel position over all converters in the
+    order given (channels of adcs[0] first, see base).
+    """
+
+    def __init__(self, adcs, margin_pct=10):
+        """
+        :param adcs: ADS1118 instances, scanned in this order.
+        :param margin_pct: Padding of the nominal conversion time, the internal oscillator is only accurate to +-10%.
+        """
+        if not adcs:
+            raise ValueError("At least one ADS1118 is required")
+        if any(adc.continuous for adc in adcs):
+            raise ValueError("The scanner needs ADS1118 in single-shot mode")
+        self.adcs = adcs
+        self.margin_pct = margin_pct
+        self.base = []
+        total = 0
+        for adc in adcs:
+            self.base.append(total)
+            total += adc.nr_of_ch
+        self.nr_of_ch = total
+        self.max_ch = max(adc.nr_of_ch for adc in adcs)
+        self.voltages = array('f', [0.0] * total)
+        self._pending = array('b', [-1] * len(adcs))   # channel converting, -1 = none
+        self._next = bytearray(len(adcs))                # channel to start next
+        self._left = bytearray(len(adcs))                # starts left for _next, 0 = new block
+        self._round_us = None                            # ticks_us of the last round
+        self.samples = array('L', [0] * len(adcs))
+        self.errors = array('L', [0] * len(adcs))
+        self.sweeps = 0
+        self.sweep_us = 0
+        self._stats_us = time.ticks_us()
+
+    def conversion_us(self):
+        """Padded conversion time of the slowest converter in microseconds."""
+        slowest = min(ADS1118._DR_SPS[adc.dr] for adc in self.adcs)
+        return 1000000 * (100 + self.margin_pct) // (100 * slowest)
+
+    def rounds(self):
+        """Rounds per sweep: the most conversions any converter needs for all its channels."""
+        return max(sum(adc.oversampling) for adc in self.adcs)
+
+    def min_sweep_us(self):
+        """Theoretical sweep time: one nominal conversion per round."""
+        slowest = min(ADS1118._DR_SPS[adc.dr] for adc in self.adcs)
+        return self.rounds() * 1000000 // slowest
+
+    def _round(self):
+        """Read the pending result of every converter and start its next channel."""
+        self._round_us = time.ticks_us()
+        for i in range(len(self.adcs)):
+            adc = self.adcs[i]
+            ch = self._next[i]
+            try:
+                raw = adc._transfer(adc._start_words[ch])
+            except Exception as e:
+                adc.log.error(f"Scan of ADC {i} failed: {e}", ctx="ads1118")
+                self.errors[i] += 1
+                if self._pending[i] >= 0:
+                    self.voltages[self.base[i] + self._pending[i]] = float("nan")
+                    adc.reset_accumulator(self._pending[i])
+                self._pending[i] = -1
+                continue
+            pending = self._pending[i]
+            if pending >= 0:
+                voltage = adc.accumulate(pending, raw)
+                if voltage is not None:
+                    self.voltages[self.base[i] + pending] = voltage
+                self.samples[i] += 1
+            self._pending[i] = ch
+            left = (self._left[i] or adc.oversampling[ch]) - 1
+            self._left[i] = left
+            if left == 0:
+                self._next[i] = ch + 1 if ch + 1 < adc.nr_of_ch else 0
+
+    async def sweep(self):
+        """
+        Run one sweep and return voltages.
+
+        A sweep started more than a round after the previous one first
+        restarts the pipeline, so no result is older than one conversion.
+        """
+        conv_us = self.conversion_us()
+        start = time.ticks_us()
+        if self._round_us is None or time.ticks_diff(start, self._round_us) > 2 * conv_us:
+            for i in range(len(self.adcs)):
+                self._pending[i] = -1
+                self._next[i] = 0
+                self._left[i] = 0
+                self.adcs[i].reset_accumulator()
+            self._round()
+        for _ in range(self.rounds()):
+            wait = conv_us - time.ticks_diff(time.ticks_us(), self._round_us)
+            if wait >= 1000:
+                await asyncio.sleep_ms(wait // 1000)
+                wait = conv_us - time.ticks_diff(time.ticks_us(), self._round_us)
+            if wait > 0:
+                time.sleep_us(wait)  # sub-millisecond rest, not worth a task switch
+            self._round()
+        self.sweep_us = time.ticks_diff(time.ticks_us(), start)
+        self.sweeps += 1
+        return self.voltages
+
+    def stats(self):
+        """Achieved samples/s per converter since reset_stats() and the last sweep time."""
+        elapsed = time.ticks_diff(time.ticks_us(), self._stats_us) or 1
+        return {
+            "sps": [self.samples[i] * 1000000 / elapsed for i in range(len(self.adcs))],
+            "errors": list(self.errors),
+            "sweeps": self.sweeps,
+            "sweep_us": self.sweep_us,
+            "min_sweep_us": self.min_sweep_us(),
+        }
+
+    def reset_stats(self):
+        for i in range(len(self.adcs)):
+            self.samples[i] = 0
+            self.errors[i] = 0
+        self.sweeps = 0
+        self._stats_us = time.ticks_us()
+
+
@@ -1,13 +1,78 @@
 from ADES1830_REG import RegisterMap
 from ADES1830_HAL import HAL
 import time
+import math
 import struct
+import asyncio
+from array import array
+from collections import namedtuple
+try:
+    import ADES1830_REGDEF # generated by tools/gen_ades1830_regs.py
+except ImportError:
+    ADES1830_REGDEF = None
+
+# One coherent acquisition taken between SNAP and UNSNAP, see ADES1830.acquire_snapshot().
+# cells/s_cells are tuples of signed raw codes (flat over the chain), vstr is the
+# summed string voltage in V and ov_uv holds the raw RDSTATD flags per device.
+SnapshotFrame = namedtuple("SnapshotFrame", ("ticks_us", "conv_cnt", "cells", "s_cells", "vstr", "ov_uv"))
 
 class ADES1830:
-    def __init__(self):
-        self.hal = HAL()
-        self.register_map = RegisterMap("registers.json", hal=self.hal)
-        self.nr_of_cells = 16
+    # Read command per cell result mode
+    CELL_READ_ADDRESS = {
+        "normal":   0x00C, # RDCVALL
+        "average":  0x04C, # RDACALL
+        "filtered": 0x018, # RDFCALL
+        "switch":   0x010, # RDSALL
+    }
+
+    # Read commands of the six 3-cell register groups A..F per result mode
+    CELL_GROUP_ADDRESS = {
+        "normal":   (0x004, 0x006, 0x008, 0x00A, 0x009, 0x00B), # RDCVA..F
+        "average":  (0x044, 0x046, 0x048, 0x04A, 0x049, 0x04B), # RDACA..F
+        "filtered": (0x012, 0x013, 0x014, 0x015, 0x016, 0x017), # RDFCA..F
+        "switch":   (0x003, 0x005, 0x007, 0x00D, 0x00E, 0x00F), # RDSVA..F
+    }
+
+    # Poll command per conversion kind, "counter" waits for RDSTATC to advance
+    POLL_COMMAND = {
+        "any":  0x718, # PLADC
+        "cell": 0x71C, # PLCADC
+        "s":    0x71D, # PLSADC
+        "aux":  0x71E, # PLAUX
+        "aux2": 0x71F, # PLAUX2
+    }
+    CELLS_PER_DEVICE = 16
+    # C-ADC conversion period, all cells convert at once (continuous mode)
+    C_CONV_US = 1000
+    # -3dB corner in Hz per CFGA iir_filter code (FC), 0 = filter off
+    IIR_CORNER_HZ = (0, 110, 45, 21, 10, 5, 1.25, 0.625)
+
+    def __init__(self, hal=None, nr_of_devices=1):
+        """nr_of_devices > 1 drives a daisy chain (taken from hal if given),
+        cell results are then one flat list over the chain (device 0 first).
+        Register getters act on device 0, register writes go to every device,
+        except the balancing duty which is set per cell (see write_pwm())."""
+        self.hal = hal if hal is not None else HAL(nr_of_devices=nr_of_devices)
+        self.register_map = RegisterMap("registers.json", hal=self.hal, shadow=True, regdef=ADES1830_REGDEF)
+        self.nr_of_devices = self.hal.nr_of_devices
+        self.nr_of_cells = self.CELLS_PER_DEVICE * self.nr_of_devices
+        self._cell_fmt = '<%dH' % self.nr_of_cells
+        # Result buffers of read_cycle_raw(), overwritten by every cycle
+        self.cycle_vstr = array('H', [0] * self.nr_of_devices)         # raw RDAUXD string voltage codes
+        self.cycle_flags = bytearray(4 * self.nr_of_devices)            # raw RDSTATD OV/UV flag bytes
+        self.cycle_gpio = array('h', [0] * (10 * self.nr_of_devices))  # signed GPIO1..10 codes
+        self.set_cell_map()
+        self._snap_plans = {}
+        self._snap_cells = array('h', [0] * self.nr_of_cells)
+        self._snap_s_cells = array('h', [0] * self.nr_of_cells)
+        self._snap_vstr = array('H', [0] * self.nr_of_devices)
+        self._last_conv_cnt = -1    # conversion counter a "counter" wait started from
+        self.c_continuous = False   # last ADCV started continuous conversions
+        # Last written balancing duty, see write_pwm()
+        self._pwm = bytearray(self.nr_of_cells)
+        self._pwm_words = None      # (PWMA, PWMB) per device as written, None = unknown
+        self._pwm_writes = 0
+        self.pwm_verify_interval = 16
         self.initialize_registers()
 
     def initialize_registers(self):
@@ -22,6 +87,7 @@ class ADES1830:
         self.rdauxd = self.register_map.get_register("RDAUXD")
         self.pwma = self.register_map.get_register("PWMA")
         self.pwmb = self.register_map.get_register("PWMB")
+        self._pwm_plan = ((self.pwma.read_address, 6), (self.pwmb.read_address, 6))
     
     def init(self, ov, uv) -> int:
         self.hal.wakeup()
@@ -30,25 +96,149 @@ class ADES1830:
         self.hal.wakeup()
         self.reset_command_counter()
         #self.reset_reg_to_default()
+        # Both thresholds live in CFGB, collapse them into one write
+        self.register_map.begin()
         self.set_cell_undervoltage(uv)
         self.set_cell_overvoltage(ov)
+        self.register_map.flush()
         # Turn on Reference voltage
         if self.set_ref_power_up(1) != 1 :
             raise Exception(f"Reference Power-Up not set")
         self.start_cell_volt_conv(redundant=False, continuous=False, discharge_permitted=False, reset_filter=False, openwire=0)
-        time.sleep_ms(1)
+        self.wait_conversion_blocking("cell")
         vcell = self.get_all_cell_voltages()
-        nr_of_cells = len([x for x in vcell if x > 1.1]) # TODO: magic nr
-        if nr_of_cells == None: 
-            raise ValueError(f"Initial Cell detection not successful")
-        else:
-            return nr_of_cells
+        # Channels with a tap connected, the cycle reads only fetch these
+        self.set_cell_map([i for i, x in enumerate(vcell) if x > 1.1]) # TODO: magic nr
+        return len(self.cell_map)
+
+    def set_cell_map(self, channels=None):
+        """Select the populated channels, flat over the chain (device * 16 + channel).
+
+        Logical cell k of read_cells() and read_cycle() is channel channels[k],
+        None maps every channel. Cycle reads then fetch only the register
+        groups (RDxVA..F) holding mapped channels, or the whole RDxALL frame
+        where that moves fewer bytes.
+        """
+        if channels is None:
+            channels = range(self.nr_of_cells)
+        channels = tuple(channels)
+        for ch in channels:
+            if not 0 <= ch < self.nr_of_cells:
+                raise ValueError(f"Channel {ch} out of range 0-{self.nr_of_cells - 1}")
+        self.cell_map = channels
+        self._cell_plans = {}
+        self._cycle_plans = {}
+        self._gpio_plans = {}
+        self._counter_plans = {}
+        self.cycle_codes = array('h', [0] * len(channels))
+
+    def _cell_plan(self, mode):
+        """Return (read plan, slots) for the mapped cells, slots[k] = (plan entry, byte offset).
+
+        slots is None if every channel is mapped in order.
+        """
+        entry = self._cell_plans.get(mode)
+        if entry is None:
+            n = self.nr_of_devices
+            per_device = self.CELLS_PER_DEVICE
+            groups = sorted(set((ch % per_device) // 3 for ch in self.cell_map))
+            # A group frame moves 4 + 8n bytes, the full frame 4 + 34n
+            if len(groups) * (4 + 8 * n) < 4 + 34 * n:
+                plan = tuple((self.CELL_GROUP_ADDRESS[mode][g], 6) for g in groups)
+                slots = tuple((groups.index((ch % per_device) // 3), (ch // per_device) * 6 + (ch % per_device) % 3 * 2)
+                              for ch in self.cell_map)
+            else:
+                plan = ((self.CELL_READ_ADDRESS[mode], 32),)
+                slots = tuple((0, (ch // per_device) * 32 + (ch % per_device) * 2) for ch in self.cell_map)
+                if self.cell_map == tuple(range(self.nr_of_cells)):
+                    slots = None
+            entry = (plan, slots)
+            self._cell_plans[mode] = entry
+        return entry
+
+    def decode_mapped_codes(self, views, slots, out):
+        """Fill out with the signed codes of the mapped cells from the views of a cell plan."""
+        if slots is None: # every channel in order, one RDxALL frame
+            self._decode_signed(views[0], 0, self.nr_of_cells, out, 0)
+            return out
+        for k in range(len(slots)):
+            entry, offset = slots[k]
+            data = views[entry]
+            code = data[offset] | (data[offset + 1] << 8)
+            out[k] = code - 0x10000 if code & 0x8000 else code
+        return out
+
+    def read_cells(self, out=None, mode: str = "average"):
+        """Read the mapped cells only and return their signed raw codes (array('h')), see set_cell_map()."""
+        if mode not in self.CELL_READ_ADDRESS:
+            raise ValueError("Mode must be 'normal', 'average', 'filtered', or 'switch'")
+        plan, slots = self._cell_plan(mode)
+        if out is None:
+            out = array('h', [0] * len(self.cell_map))
+        return self.decode_mapped_codes(self.hal.read_many(plan), slots, out)
+
+    def read_cells_counter(self, out, mode: str = "average") -> int:
+        """Read the mapped cells into out (array('h'), logical order) and the
+        conversion counter in one burst, return the counter."""
+        if mode not in self.CELL_READ_ADDRESS:
+            raise ValueError("Mode must be 'normal', 'average', 'filtered', or 'switch'")
+        cell_plan, slots = self._cell_plan(mode)
+        plan = self._counter_plans.get(mode)
+        if plan is None:
+            plan = cell_plan + ((0x032, 6),) # RDSTATC
+            self._counter_plans[mode] = plan
+        results = self.hal.read_many(plan)
+        self.decode_mapped_codes(results, slots, out)
+        statc = results[len(cell_plan)]
+        return self.decode_conversion_counter(statc[2] | (statc[3] << 8))
 
     def reset_reg_to_default(self):
         self.register_map.write_defaults()
 
+    def set_iir_filter(self, fc: int):
+        """Set the IIR filter code of the filtered cell results (RDFCALL), 0 = off."""
+        if not 0 <= fc <= 7:
+            raise ValueError("fc must be 0-7")
+        self.cfga.set_iir_filter(fc)
+
+    def get_iir_filter(self):
+        return self.cfga.get_iir_filter()
+
+    def set_iir_corner(self, corner_hz: float) -> int:
+        """Select the filter code whose corner is closest to corner_hz, 0 turns it off.
+
+        Returns the code written, the exact corner is IIR_CORNER_HZ[code].
+        """
+        fc = 0
+        if corner_hz > 0:
+            corners = self.IIR_CORNER_HZ
+            fc = min(range(1, 8), key=lambda i: max(corners[i] / corner_hz, corner_hz / corners[i]))
+        self.set_iir_filter(fc)
+        return fc
+
+    def iir_latency(self, fc: int = None):
+        """Return the response time of the filtered results for code fc (default: configured).
+
+        The IIR is a single pole, so tau_ms is also its delay for slow signals
+        and t90_ms/t99_ms the time a step needs to reach 90%/99%. All zero
+        with the filter off.
+        """
+        if fc is None:
+            fc = self.get_iir_filter()
+        corner = self.IIR_CORNER_HZ[fc]
+        if corner == 0:
+            return {"corner_hz": 0, "tau_ms": 0, "t90_ms": 0, "t99_ms": 0}
+        tau_ms = 1000 / (2 * math.pi * corner)
+        return {
+            "corner_hz": corner,
+            "tau_ms":    round(tau_ms, 2),
+            "t90_ms":    round(tau_ms * 2.303, 1),  # ln(10)
+            "t99_ms":    round(tau_ms * 4.605, 1),  # ln(100)
+        }
+
     def set_ref_power_up(self, value: int):
         self.cfga.set_ref_pwr_up(value)
+        self.cfga.refresh() # verify against the device, not the shadow value
         return self.cfga.get_ref_pwr_up()
     
     def get_cell_undervoltage(self):
@@ -80,45 +270,196 @@ class ADES1830:
     
     def get_all_cell_voltages(self, mode: str = "normal"):
         # Check parameters
-        if mode not in ["normal", "average", "filtered", "switch"]:
+        if mode not in self.CELL_READ_ADDRESS:
             raise ValueError("Mode must be 'normal', 'average', 'filtered', or 'switch'")
-        if mode == "normal":
-            address=0x00C #RDCVALL
-        elif mode == "average":
-            address=0x04C #RDACALL
-        elif mode == "filtered":
-            address=0x018 #RDFCALL
-        elif mode == "switch":
-            address=0x010 #RDSALL
-        data = self.hal.read(address=address, length=32)
-        if len(data) != 32:
-            raise ValueError("Expected 36-byte array from rdcva.read()")
-        raw_voltages = struct.unpack('<16H', data[:32])
-        cell_voltages = [self.to_voltage_16bit(voltage) for voltage in raw_voltages]
-        return cell_voltages  # Or handle other modes appropriately
+        data = self.hal.read(address=self.CELL_READ_ADDRESS[mode], length=32)
+        if len(data) != 32 * self.nr_of_devices:
+            raise ValueError("Expected 32 bytes per device from hal.read()")
+        return self.decode_cell_voltages(data)
 
-    def get_pwm(self):
-        # Get integer values from pwma and pwmb
-        pwm_int_a = self.pwma.get_pwm()
-        pwm_int_b = self.pwmb.get_pwm()
-        # Convert integers to bytes (little-endian)
-        pwm_bytes_a = pwm_int_a.to_bytes(6,"little")  # 12 4-bit values = 6 bytes
-        pwm_bytes_b = pwm_int_b.to_bytes(2,"little")  # 4 4-bit values = 2 bytes
-
-        pwm_bytes = pwm_bytes_a + pwm_bytes_b  # 6 + 2 = 8 bytes
-        # Unpack bytes into 4-bit values
-        pwm = []
-        for b in pwm_bytes:
-            high, low = self.unpack_nibbles(b)
-            pwm.append(high)
-            pwm.append(low)
+    def decode_cell_voltages(self, data):
+        raw_voltages = struct.unpack(self._cell_fmt, data)
+        return [self.to_voltage_16bit(voltage) for voltage in raw_voltages]
 
-        # Validate the resulting list
-        if len(pwm) != 16:
-            raise ValueError("Expected 16 PWM values, got {}".format(len(pwm)))
-        if any(not (0 <= x <= 15) for x in pwm):
-            raise ValueError("PWM values must be between 0 and 15 (4-bit)")
+    def new_cell_array(self):
+        """Return an array('h') sized for the cell results of the chain."""
+        return array('h', [0] * self.nr_of_cells)
 
+    def get_cell_codes(self, out=None, mode: str = "normal"):
+        """Fill out (array('h')) with the signed raw cell codes and return it.
+
+        Code c corresponds to c * 150uV + 1.5V, see code_to_mv().
+        """
+        if mode not in self.CELL_READ_ADDRESS:
+            raise ValueError("Mode must be 'normal', 'average', 'filtered', or 'switch'")
+        if out is None:
+            out = self.new_cell_array()
+        data = self.hal.read_view(self.CELL_READ_ADDRESS[mode], 32)
+        return self.decode_cell_codes(data, out)
+
+    def get_cell_millivolts(self, out=None, mode: str = "normal"):
+        """Fill out (array('h')) with the cell voltages in integer mV and return it."""
+        out = self.get_cell_codes(out, mode)
+        for i in range(self.nr_of_cells):
+            out[i] = self.code_to_mv(out[i])
+        return out
+
+    def decode_cell_codes(self, data, out):
+        """Fill out with the signed codes of an RDxALL frame, straight from the bytes."""
+        self._decode_signed(data, 0, self.nr_of_cells, out, 0)
+        return out
+
+    def read_cycle(self, mode: str = "average", gpio: bool = False):
+        """Read cells, string voltage, conversion counter and OV/UV flags in one burst.
+
+        Returns a dict with the decoded values, all taken within one HAL call.
+        In a chain vstr is the sum over all devices, conv_cnt is taken from
+        device 0 and vcell/ov/uv hold the mapped cells in logical order (see
+        set_cell_map()), only their register groups are read. "codes" holds
+        the signed raw codes behind vcell, an array('h') reused by the next
+        call (copy it, e.g. into a SampleRing, to keep it). With gpio=True
+        the aux groups are read as well and "gpio" holds the raw GPIO1..10
+        codes, 10 per device, e.g. for ADES1830_NTC.ThermistorBank.
+        """
+        conv_cnt = self.read_cycle_raw(mode, gpio)
+        per_device = self.CELLS_PER_DEVICE
+        flags = self.cycle_flags
+        ov = []
+        uv = []
+        for ch in self.cell_map:
+            bit = 2 * (ch % per_device)
+            bits = flags[4 * (ch // per_device) + (bit >> 3)] >> (bit & 7)
+            uv.append(bits & 1)
+            ov.append((bits >> 1) & 1)
+        cycle = {
+            "vcell":    [self.to_voltage_16bit(code & 0xFFFF) for code in self.cycle_codes],
+            "codes":    self.cycle_codes,
+            "vstr":     self.string_voltage(self.cycle_vstr),
+            "conv_cnt": conv_cnt,
+            "ov":       ov,
+            "uv":       uv,
+        }
+        if gpio:
+            cycle["gpio"] = list(self.cycle_gpio)
+        return cycle
+
+    def read_cycle_raw(self, mode: str = "average", gpio: bool = False) -> int:
+        """Allocation free core of read_cycle(), returns the conversion counter.
+
+        Decodes the burst straight from the HAL views into the preallocated
+        cycle_codes (mapped cells, logical order), cycle_vstr, cycle_flags
+        (4 RDSTATD bytes per device, UV/OV bit pairs per cell) and, with
+        gpio=True, cycle_gpio. The next call overwrites all of them.
+        """
+        if mode not in self.CELL_READ_ADDRESS:
+            raise ValueError("Mode must be 'normal', 'average', 'filtered', or 'switch'")
+        plans = self._gpio_plans if gpio else self._cycle_plans
+        plan = plans.get(mode)
+        cell_plan, slots = self._cell_plan(mode)
+        if plan is None:
+            plan = cell_plan + (
+                    (0x01F, 6), # RDAUXD
+                    (0x032, 6), # RDSTATC
+                    (0x033, 6)) # RDSTATD
+            if gpio:
+                plan += ((0x019, 6), # RDAUXA
+                         (0x01A, 6), # RDAUXB
+                         (0x01B, 6)) # RDAUXC
+            plans[mode] = plan
+        results = self.hal.read_many(plan)
+        m = len(cell_plan)
+        self.decode_mapped_codes(results, slots, self.cycle_codes)
+        self.decode_string_codes(results[m], self.cycle_vstr)
+        statd = results[m + 2]
+        flags = self.cycle_flags
+        for device in range(self.nr_of_devices):
+            for i in range(4):
+                flags[4 * device + i] = statd[6 * device + i]
+        if gpio:
+            self.decode_gpio_codes(results[m + 3], results[m + 4], results[m + 5], results[m], self.cycle_gpio)
+        statc = results[m + 1]
+        return self.decode_conversion_counter(statc[2] | (statc[3] << 8))
+
+    def decode_gpio_codes(self, auxa, auxb, auxc, auxd, out=None):
+        """Fill out (array('h'), 10 per device) with the signed raw GPIO1..10 codes of RDAUXA..D."""
+        if out is None:
+            out = array('h', [0] * (10 * self.nr_of_devices))
+        for device in range(self.nr_of_devices):
+            offset = 6 * device
+            k = 10 * device
+            self._decode_signed(auxa, offset, 3, out, k)
+            self._decode_signed(auxb, offset, 3, out, k + 3)
+            self._decode_signed(auxc, offset, 3, out, k + 6)
+            self._decode_signed(auxd, offset, 1, out, k + 9)
+        return out
+
+    @staticmethod
+    def _decode_signed(data, offset, count, out, k):
+        # count little endian int16 codes from data[offset:] into out[k:], no temporaries
+        for i in range(count):
+            code = data[offset + 2 * i] | (data[offset + 2 * i + 1] << 8)
+            out[k + i] = code - 0x10000 if code & 0x8000 else code
+
+    def acquire_snapshot(self, mode: str = "average"):
+        """Freeze the result registers with SNAP, read all result groups in one
+        batch and release them with UNSNAP.
+
+        Returns an immutable SnapshotFrame, so pack level math (sum of cells vs.
+        string voltage, C-ADC vs. S-ADC) works on values from the same instant.
+        """
+        if mode not in self.CELL_READ_ADDRESS:
+            raise ValueError("Mode must be 'normal', 'average', 'filtered', or 'switch'")
+        plan = self._snap_plans.get(mode)
+        if plan is None:
+            plan = ((self.CELL_READ_ADDRESS[mode], 32),
+                    (self.CELL_READ_ADDRESS["switch"], 32),
+                    (0x01F, 6), # RDAUXD
+                    (0x032, 6), # RDSTATC
+                    (0x033, 6)) # RDSTATD
+            self._snap_plans[mode] = plan
+        self.snapshot()
+        ticks = time.ticks_us() # the instant the results were frozen
+        try:
+            cells, s_cells, auxd, statc, statd = self.hal.read_many(plan)
+            # Decode while the views are valid, the frame copies only the results
+            self.decode_cell_codes(cells, self._snap_cells)
+            self.decode_cell_codes(s_cells, self._snap_s_cells)
+            self.decode_string_codes(auxd, self._snap_vstr)
+            conv_cnt = self.decode_conversion_counter(statc[2] | (statc[3] << 8))
+            ov_uv = tuple(statd[6 * device] | (statd[6 * device + 1] << 8) | (statd[6 * device + 2] << 16)
+                          | (statd[6 * device + 3] << 24) for device in range(self.nr_of_devices))
+        finally:
+            self.release_snapshot()
+        return SnapshotFrame(ticks, conv_cnt, tuple(self._snap_cells), tuple(self._snap_s_cells),
+                             self.string_voltage(self._snap_vstr), ov_uv)
+
+    def decode_string_codes(self, auxd, out):
+        """Fill out (array('H'), one per device) with the raw string voltage codes of RDAUXD (bits 32..47)."""
+        for device in range(self.nr_of_devices):
+            out[device] = auxd[6 * device + 4] | (auxd[6 * device + 5] << 8)
+        return out
+
+    def string_voltage(self, codes):
+        """Return the string voltage in V of raw RDAUXD codes, a chain sums its devices."""
+        vstr = 0.0
+        for code in codes:
+            vstr += self.to_voltage_16bit(code, lsb = 0.00375, offset=37.5)
+        return round(vstr, 3)
+
+    def decode_string_voltage(self, auxd):
+        return self.string_voltage(self.decode_string_codes(auxd, array('H', [0] * self.nr_of_devices)))
+
+    def get_pwm(self):
+        """Read the balancing duty of every cell of the chain (16 values 0-15 per device)."""
+        data_a, data_b = self.hal.read_many(self._pwm_plan)
+        pwm = []
+        for device in range(self.nr_of_devices):
+            # PWMA holds 12 4-bit values in 6 bytes, PWMB 4 in its low 2 bytes
+            pwm_bytes = bytes(data_a[6 * device:6 * device + 6]) + bytes(data_b[6 * device:6 * device + 2])
+            for b in pwm_bytes:
+                high, low = self.unpack_nibbles(b)
+                pwm.append(high)
+                pwm.append(low)
         return pwm
     
     def get_pwm_cell(self, cell):
@@ -126,39 +467,90 @@ class ADES1830:
         return pwm[cell]
     
     def set_pwm(self, pwm):
-        # Validate input
-        if len(pwm) != 16:
-            raise ValueError("PWM list must have exactly 16 elements")
-        if any(not (0 <= x <= 15) for x in pwm):
-            raise ValueError("PWM values must be integers between 0 and 15 (4-bit)")
-
-        # Pack 4-bit values into bytes (two 4-bit values per byte)
-        pwm_bytes_a = bytearray()
-        for i in range(0, 11, 2):  # Process pwm[0:12] in pairs
-            pwm_bytes_a.append(self.pack_nibbles(pwm[i],pwm[i + 1]))
-
-        pwm_bytes_b = bytearray()
-        for i in range(12, 15, 2):  # Process pwm[13:] in pairs
-            pwm_bytes_b.append(self.pack_nibbles(pwm[i],pwm[i + 1]))
-
-        # Convert packed bytes to integers
-        pwm_int_a = int.from_bytes(pwm_bytes_a, "little")
-        pwm_int_b = int.from_bytes(pwm_bytes_b, "little")
-        # Pass integers to set_pwm methods
-        self.pwma.set_pwm(pwm_int_a)
-        self.pwmb.set_pwm(pwm_int_b)
-    
-        return self.get_pwm()
-    
+        """Set the balancing duty of all cells of the chain and return it, see write_pwm()."""
+        self.write_pwm(pwm)
+        return list(self._pwm)
+
     def set_pwm_cell(self, cell_pwm, cell):
-        pwm = bytearray(self.get_pwm())
+        pwm = bytearray(self._pwm) if self._pwm_words is not None else bytearray(self.get_pwm())
         pwm[cell] = cell_pwm
-        self.set_pwm(pwm)
-        return self.get_pwm_cell(cell)
+        self.write_pwm(pwm)
+        return self._pwm[cell]
+
+    def write_pwm(self, pwm) -> int:
+        """Write the balancing duty (16 values 0-15 per device, flat over the chain),
+        sending only changed registers.
+
+        Each device gets its own PWMA/PWMB word in one chain write. The last
+        written words are kept, so an unchanged group costs nothing and a
+        typical update is a single SPI write. Every pwm_verify_interval
+        writes both groups are read back and compared (0 disables the
+        readback); a mismatch forgets the kept state and raises ValueError.
+        Returns the number of registers written.
+        """
+        n = self.nr_of_cells
+        if len(pwm) != n:
+            raise ValueError(f"PWM list must have exactly {n} elements")
+        words_a = [0] * self.nr_of_devices
+        words_b = [0] * self.nr_of_devices
+        for i in range(n):
+            x = pwm[i]
+            if not 0 <= x <= 15:
+                raise ValueError("PWM values must be integers between 0 and 15 (4-bit)")
+            device, cell = divmod(i, self.CELLS_PER_DEVICE)
+            # two cells per byte, even cell in the high nibble
+            shift = ((cell >> 1) << 3) + (0 if cell & 1 else 4)
+            if cell < 12:
+                words_a[device] |= x << shift
+            else:
+                words_b[device] |= x << (shift - 48)
+        words_a = tuple(words_a)
+        words_b = tuple(words_b)
+        words = self._pwm_words
+        written = 0
+        if words is None or words[0] != words_a:
+            self.pwma.write(words_a)
+            written += 1
+        if words is None or words[1] != words_b:
+            self.pwmb.write(words_b)
+            written += 1
+        self._pwm_words = (words_a, words_b)
+        for i in range(n):
+            self._pwm[i] = pwm[i]
+        if written:
+            self._pwm_writes += 1
+            if self.pwm_verify_interval and self._pwm_writes >= self.pwm_verify_interval:
+                self.verify_pwm()
+        return written
+
+    def verify_pwm(self):
+        """Read PWMA/PWMB of every device back and compare them against the last written duty."""
+        self._pwm_writes = 0
+        if self._pwm_words is None:
+            return
+        data_a, data_b = self.hal.read_many(self._pwm_plan)
+        for device in range(self.nr_of_devices):
+            if (int.from_bytes(data_a[6 * device:6 * device + 6], "little") != self._pwm_words[0][device]
+                    or int.from_bytes(data_b[6 * device:6 * device + 6], "little") != self._pwm_words[1][device]):
+                self._pwm_words = None
+                raise ValueError(f"PWM readback mismatch on device {device}")
 
     def get_device_id(self):
         return self.rdsid.get_device_id()
 
+    def health_snapshot(self, per_device: bool = False):
+        """Read every register in one batch and return the serialized snapshot.
+
+        per_device=True returns one blob per device of the same batch (91
+        bytes each) instead of one for the chain. Decoded field values are
+        available afterwards through register_map.snapshot_dict(), see
+        RegisterMap.snapshot().
+        """
+        self.register_map.snapshot()
+        if per_device:
+            return [self.register_map.snapshot_bytes(device) for device in range(self.nr_of_devices)]
+        return self.register_map.snapshot_bytes()
+
     def get_internal_temp(self):
         i_temp = self.rdstata.get_internal_temp()
         return self.code_to_temp(i_temp)
@@ -172,7 +564,9 @@ class ADES1830:
         return self.to_voltage_16bit(dig_sup_vol)
 
     def get_ov_uv_flag(self):
-        flags = self.rdstatd.get_ov_uv_flag()
+        return self.decode_ov_uv_flag(self.rdstatd.get_ov_uv_flag())
+
+    def decode_ov_uv_flag(self, flags):
         result_ov = []
         result_uv = []
         for cell in range(16):
@@ -182,10 +576,54 @@ class ADES1830:
         return result_ov,result_uv
     
     def get_conversion_counter(self):
-        reg = self.rdstatc.get_conversion_counter()
+        return self.decode_conversion_counter(self.rdstatc.get_conversion_counter())
+
+    def decode_conversion_counter(self, reg):
         msb = (reg & 0xFF) << 6
         lsb = ((reg >> 10) & 0xFF)
         return msb + lsb 
+    def conversion_done(self, kind: str = "cell"):
+        """Poll once whether the last conversion of given kind has finished.
+
+        For kind "counter" this is True once the conversion counter advanced
+        past the value taken when the wait started (see wait_conversion()),
+        the first call without a wait takes that value and returns False.
+        """
+        if kind == "counter":
+            count = self.get_conversion_counter()
+            if self._last_conv_cnt < 0:
+                self._last_conv_cnt = count
+                return False
+            return count != self._last_conv_cnt
+        if kind not in self.POLL_COMMAND:
+            raise ValueError("kind must be 'any', 'cell', 's', 'aux', 'aux2' or 'counter'")
+        return self.hal.poll(self.POLL_COMMAND[kind])
+
+    def wait_conversion_blocking(self, kind: str = "cell", timeout_ms: int = 20):
+        """Busy-wait for a conversion, returns the time waited in us."""
+        start = time.ticks_us()
+        if kind == "counter":
+            self._last_conv_cnt = self.get_conversion_counter()
+        while not self.conversion_done(kind):
+            if time.ticks_diff(time.ticks_us(), start) > timeout_ms * 1000:
+                raise asyncio.TimeoutError()
+        return time.ticks_diff(time.ticks_us(), start)
+
+    async def wait_conversion(self, kind: str = "cell", timeout_ms: int = 20):
+        """Wait for a conversion, yielding to other tasks between polls.
+
+        Returns the time waited in us, raises asyncio.TimeoutError.
+        For kind "counter" it waits for a conversion that completes after the call.
+        """
+        start = time.ticks_us()
+        if kind == "counter":
+            self._last_conv_cnt = self.get_conversion_counter()
+        while not self.conversion_done(kind):
+            if time.ticks_diff(time.ticks_us(), start) > timeout_ms * 1000:
+                raise asyncio.TimeoutError()
+            await asyncio.sleep_ms(0)
+        return time.ticks_diff(time.ticks_us(), start)
+
 #################################################################
 #  Commands
 #################################################################        
@@ -214,6 +652,7 @@ class ADES1830:
             | ((1 if reset_filter else 0) << 2)
             | (openwire & 0x3)
         )
+        self.c_continuous = continuous
         self.hal.command(command)  # ADCV, RD=0 (Redundant), CONT=1(continuous), DCP=0(discharge permitted), RSTF=0 (reset filter), OW=00 (openwire detection)
     
     def start_s_adc_conv(self, continuous: bool = False,
@@ -296,6 +735,9 @@ class ADES1830:
 
     def soft_reset(self):
         self.hal.command(0x027) # SRST
+        self.c_continuous = False
+        self.register_map.invalidate()
+        self._pwm_words = None
     
     def reset_command_counter(self): # RSTCC
         self.hal.command(0x02E)
@@ -355,6 +797,15 @@ class ADES1830:
             digital_code = (digital_code + 65536) & 0xFFFF  # Two's complement for 16 bits
         return digital_code
 
+    @staticmethod
+    def code_to_mv(code):
+        # 150uV/LSB with 1.5V offset, rounded to the nearest mV in integer math
+        return 1500 + (code * 3 + 10) // 20
+
+    @staticmethod
+    def mv_to_voltage(mv):
+        return mv / 1000
+
     def to_voltage_16bit(self, digital_code, lsb = 0.00015, offset = 1.5):
         LSB = lsb
         OFFSET = offset
@@ -0,0 +1,110 @@
+import time
+import asyncio
+
+class BalanceCoordinator:
+    """Interleaves passive balancing with clean cell measurements.
+
+    Balancing runs until a measurement is due, then window() mutes the
+    discharge, lets the cell inputs settle, waits for enough fresh C-ADC
+    conversions to fill the requested result register, runs the reads and
+    unmutes again. Conversions come from a continuous ADCV and are timed
+    with the conversion period of the driver (ADES1830.C_CONV_US). Windows
+    are skipped while no cell is balancing. The muted time is accounted so
+    lost_duty() reports the share of balancing time given up for
+    measurements.
+    """
+    # Fresh conversions needed per result mode, the averaging register
+    # holds the mean of the last 8 conversions. Filtered results are not
+    # windowed: the IIR needs its t99 (~150 conversions at 5 Hz) to forget
+    # the unmuted ones, read them only while no cell balances.
+    CONVERSIONS = {
+        "normal":   1,
+        "switch":   1,
+        "average":  8,
+    }
+    COUNTER_MOD = 0x4000    # conversion counter is 14 bits wide
+
+    def __init__(self, ades, settle_us: int = 1000, mode: str = "average", timeout_ms: int = 50):
+        """settle_us covers the discharge switches opening and the cell input
+        filter recovering, mode selects how many conversions a window waits,
+        timeout_ms is the slack on top of their conversion time."""
+        self.ades = ades
+        self.settle_us = settle_us
+        self.timeout_ms = timeout_ms
+        self.set_mode(mode)
+        self.active = False
+        self.pwm = [0] * ades.nr_of_cells
+        self.windows = 0
+        self.last_window_us = 0
+        self.max_window_us = 0
+        self.reset_stats()
+
+    def set_mode(self, mode: str):
+        """Select the result register windows are sized for and read()s should use."""
+        if mode not in self.CONVERSIONS:
+            raise ValueError("mode must be 'normal', 'switch' or 'average'")
+        self.mode = mode
+        self.conversions = self.CONVERSIONS[mode]
+
+    def read_mode(self, idle_mode: str) -> str:
+        """Result mode a read should use now: the window mode while balancing, else idle_mode."""
+        return self.mode if self.active else idle_mode
+
+    def reset_stats(self):
+        self.muted_us = 0
+        self.since = time.ticks_us()
+
+    def set_pwm(self, pwm):
+        """Write the balancing duty, windows are only opened while any cell balances."""
+        result = self.ades.set_pwm(pwm)
+        self.pwm = list(pwm)
+        self.active = any(pwm)
+        return result
+
+    async def window(self, read):
+        """Run read() inside a muted measurement window and return its result.
+
+        Raises RuntimeError if no continuous C-ADC conversion runs (nothing
+        would refresh the results while muted) and asyncio.TimeoutError if
+        the conversions do not arrive in time; discharge is unmuted in any case.
+        """
+        if not self.active:
+            return read()
+        if not self.ades.c_continuous:
+            raise RuntimeError("Measurement window needs continuous cell conversions (ADCV CONT=1)")
+        start = time.ticks_us()
+        self.ades.mute_discharge()
+        try:
+            await asyncio.sleep_ms(self.settle_us // 1000)
+            while time.ticks_diff(time.ticks_us(), start) < self.settle_us:
+                await asyncio.sleep_ms(0)
+            await self._wait_conversions(self.conversions)
+            return read()
+        finally:
+            self.ades.unmute_discharge()
+            elapsed = time.ticks_diff(time.ticks_us(), start)
+            self.last_window_us = elapsed
+            if elapsed > self.max_window_us:
+                self.max_window_us = elapsed
+            self.muted_us += elapsed
+            self.windows += 1
+
+    async def _wait_conversions(self, n):
+        first = self.ades.get_conversion_counter()
+        start = time.ticks_ms()
+        timeout_ms = self.timeout_ms + n * self.ades.C_CONV_US // 1000
+        while (self.ades.get_conversion_counter() - first) % self.COUNTER_MOD < n:
+            if time.ticks_diff(time.ticks_ms(), start) > timeout_ms:
+                raise asyncio.TimeoutError()
+            await asyncio.sleep_ms(0)
+
+    def lost_duty(self):
+        """Share of time (0..1) balancing was muted since reset_stats()."""
+        elapsed = time.ticks_diff(time.ticks_us(), self.since)
+        if elapsed <= 0:
+            return 0.0
+        return min(1.0, self.muted_us / elapsed)
+
+    def effective_duty(self, cell: int):
+        """Effective balancing duty (0..1) of a cell after measurement windows."""
+        return self.pwm[cell] / 15 * (1.0 - self.lost_duty())
@@ -0,0 +1,209 @@
+from array import array
+import struct
+import time
+
+class RedundancyCheck:
+    """Cross-check of C-ADC against S-ADC results from the same redundant conversion.
+
+    Both result groups are read in one batch, per-cell deltas are computed in
+    raw codes (150uV/LSB) and tracked as an exponential moving average plus
+    the largest absolute delta seen. A cell is flagged once its average delta
+    drifts past the limit. Only channels of ades.cell_map are compared, the
+    statistics arrays stay indexed by channel.
+    """
+    def __init__(self, ades, limit_mv: int = 10, shift: int = 3):
+        """shift sets the average weight: each update moves it by 1/2**shift."""
+        self.ades = ades
+        self.nr_of_cells = ades.nr_of_cells
+        self.limit = limit_mv * 20 // 3   # mV -> codes
+        self.shift = shift
+        self.delta = array('h', [0] * self.nr_of_cells)     # last C-S delta in codes
+        self.avg = array('l', [0] * self.nr_of_cells)       # average delta << shift
+        self.max_abs = array('H', [0] * self.nr_of_cells)   # largest |delta| seen
+        self.faults = bytearray(self.nr_of_cells)           # 1 = drifted past limit
+        self.samples = 0
+        self.continuous = False
+        self._fmt = '<%dh' % self.nr_of_cells
+        self._plan = ((ades.CELL_READ_ADDRESS["normal"], 32), (ades.CELL_READ_ADDRESS["switch"], 32))
+
+    def start(self, continuous: bool = True):
+        """Start C-ADC conversions with the S-ADC running redundantly."""
+        self.continuous = continuous
+        self.ades.start_cell_volt_conv(redundant=True, continuous=continuous, discharge_permitted=False, reset_filter=False, openwire=0)
+
+    def stop(self):
+        """Restart the C-ADC alone, freeing the S-ADC for ADSV (e.g. open-wire phases).
+
+        A redundant continuous ADCV keeps the S-ADC busy, ADSV started on top
+        of it never completes. Call start() again to resume the cross-check.
+        """
+        self.ades.start_cell_volt_conv(redundant=False, continuous=self.continuous, discharge_permitted=False, reset_filter=False, openwire=0)
+
+    def reset(self):
+        for i in range(self.nr_of_cells):
+            self.delta[i] = 0
+            self.avg[i] = 0
+            self.max_abs[i] = 0
+            self.faults[i] = 0
+        self.samples = 0
+
+    def update(self):
+        """Read both result groups and update the statistics.
+
+        Returns the number of cells currently flagged.
+        """
+        c_data, s_data = self.ades.hal.read_many(self._plan)
+        c_codes = struct.unpack(self._fmt, c_data)
+        s_codes = struct.unpack(self._fmt, s_data)
+        shift = self.shift
+        limit = self.limit << shift
+        first = self.samples == 0
+        flagged = 0
+        for i in self.ades.cell_map:
+            d = c_codes[i] - s_codes[i]
+            self.delta[i] = d
+            if first:
+                avg = d << shift
+            else:
+                avg = self.avg[i] + d - (self.avg[i] >> shift)
+            self.avg[i] = avg
+            if abs(d) > self.max_abs[i]:
+                self.max_abs[i] = abs(d)
+            if avg > limit or avg < -limit:
+                self.faults[i] = 1
+                flagged += 1
+            else:
+                self.faults[i] = 0
+        self.samples += 1
+        return flagged
+
+    def faulty_cells(self):
+        """Return the logical indices (see ADES1830.set_cell_map()) of flagged cells."""
+        return [n for n, ch in enumerate(self.ades.cell_map) if self.faults[ch]]
+
+    def avg_delta_mv(self, cell: int):
+        """Average C-S delta of logical cell in mV, for reporting."""
+        return (self.avg[self.ades.cell_map[cell]] >> self.shift) * 0.15
+
+
+class OpenWireScheduler:
+    """Spreads S-ADC open-wire checks over many monitoring cycles.
+
+    Each phase pulls down either the even or the odd cell inputs (ADSV with
+    OW=01 or OW=10) and compares the S-ADC result against the C-ADC result of
+    the same cell; a broken tap makes the pulled channel collapse. Phases
+    alternate, one every interval_ms. step() is meant to be called once per
+    monitoring cycle and does at most one SPI action, so it never blocks on a
+    conversion. It is skipped when the time already spent in the cycle plus
+    its worst observed cost would exceed budget_us.
+    """
+    # (ADSV OW code, channel parity checked): OW=01 pulls even channels C2, C4..
+    PHASES = ((1, 1), (2, 0))
+    IDLE = 0
+    CONVERTING = 1
+
+    def __init__(self, ades, interval_ms: int = 10000, budget_us: int = 5000,
+                 limit_mv: int = 400, confirm: int = 2, timeout_ms: int = 50, suspend=None, resume=None):
+        """confirm sets how many consecutive failing checks flag a cell,
+        suspend is called before each phase to free the S-ADC (e.g.
+        RedundancyCheck.stop), resume after it to restore the normal conversions."""
+        self.ades = ades
+        self.nr_of_cells = ades.nr_of_cells
+        self.interval_ms = interval_ms
+        self.budget_us = budget_us
+        self.limit = limit_mv * 20 // 3   # mV -> codes
+        self.confirm = confirm
+        self.timeout_ms = timeout_ms
+        self.suspend = suspend
+        self.resume = resume
+        self.open_wire = bytearray(self.nr_of_cells)                # 1 = open wire confirmed
+        self.hits = bytearray(self.nr_of_cells)                     # consecutive failing checks
+        self.checked = bytearray(self.nr_of_cells)                  # 1 = verdict available
+        self.checked_ms = array('L', [0] * self.nr_of_cells)        # ticks_ms of the last verdict
+        self.drop = array('h', [0] * self.nr_of_cells)              # last C-S drop in codes
+        self.state = self.IDLE
+        self.phase = 0
+        self.next_ms = time.ticks_ms()
+        self.started_ms = 0
+        self.step_us = 2000     # worst observed step cost, starts at an estimate
+        self.last_step_us = 0
+        self.skipped = 0
+        self.timeouts = 0
+        self.phases_done = 0
+        self._fmt = '<%dh' % self.nr_of_cells
+        self._plan = ((ades.CELL_READ_ADDRESS["switch"], 32), (ades.CELL_READ_ADDRESS["normal"], 32))
+
+    @property
+    def busy(self):
+        """True while an open-wire conversion owns the S-ADC results."""
+        return self.state == self.CONVERTING
+
+    def step(self, spent_us: int = 0):
+        """Advance the scheduler by at most one SPI action.
+
+        spent_us is the time the current cycle already used for the normal
+        measurement. Returns True when a phase completed in this step.
+        """
+        if spent_us + self.step_us > self.budget_us:
+            self.skipped += 1
+            return False
+        now = time.ticks_ms()
+        if self.state == self.IDLE and time.ticks_diff(now, self.next_ms) < 0:
+            return False
+        t0 = time.ticks_us()
+        done = False
+        if self.state == self.IDLE:
+            if self.suspend is not None:
+                self.suspend()
+            self.ades.start_s_adc_conv(continuous=False, discharge_permitted=False, openwire=self.PHASES[self.phase][0])
+            self.state = self.CONVERTING
+            self.started_ms = now
+        elif self.ades.conversion_done("s"):
+            self._evaluate(now)
+            self._finish(now)
+            self.phases_done += 1
+            done = True
+        elif time.ticks_diff(now, self.started_ms) > self.timeout_ms:
+            self.timeouts += 1
+            self._finish(now)
+        cost = time.ticks_diff(time.ticks_us(), t0)
+        self.last_step_us = cost
+        if cost > self.step_us:
+            self.step_us = cost
+        return done
+
+    def _finish(self, now):
+        self.state = self.IDLE
+        self.phase ^= 1
+        self.next_ms = time.ticks_add(now, self.interval_ms)
+        if self.resume is not None:
+            self.resume()
+
+    def _evaluate(self, now):
+        s_data, c_data = self.ades.hal.read_many(self._plan)
+        s_codes = struct.unpack(self._fmt, s_data)
+        c_codes = struct.unpack(self._fmt, c_data)
+        parity = self.PHASES[self.phase][1]
+        per_device = self.ades.CELLS_PER_DEVICE
+        for i in self.ades.cell_map:
+            if (i % per_device) & 1 != parity:
+                continue
+            d = c_codes[i] - s_codes[i]
+            self.drop[i] = d
+            if d > self.limit:
+                if self.hits[i] < 255:
+                    self.hits[i] += 1
+            else:
+                self.hits[i] = 0
+            self.open_wire[i] = 1 if self.hits[i] >= self.confirm else 0
+            self.checked[i] = 1
+            self.checked_ms[i] = now
+
+    def open_cells(self):
+        """Return the logical indices (see ADES1830.set_cell_map()) of cells with a confirmed open wire."""
+        return [n for n, ch in enumerate(self.ades.cell_map) if self.open_wire[ch]]
+
+    def verdicts(self):
+        """Return (cell, open, ticks_ms) for every mapped cell checked at least once, cell is the logical index."""
+        return [(n, bool(self.open_wire[ch]), self.checked_ms[ch])
+                for n, ch in enumerate(self.ades.cell_map) if self.checked[ch]]
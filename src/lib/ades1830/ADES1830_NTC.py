@@ -0,0 +1,78 @@
+from array import array
+import math
+
+# Marks a channel whose code is outside the table, i.e. an open or shorted NTC
+NTC_INVALID = -32768
+
+class NtcTable:
+    """Integer lookup from raw GPIO codes to temperature in 0.1 degC.
+
+    The table is built once from Steinhart-Hart coefficients for an NTC to
+    ground with r_series pulled up to VREF2 (3V), one entry per step degC.
+    Lookups are a binary search plus linear interpolation on integers, no
+    logarithms per sample.
+    """
+    def __init__(self, a=1.009249522e-3, b=2.378405444e-4, c=2.019202697e-7,
+                 r_series=10000, vref_mv=3000, t_min=-40, t_max=125, step=1):
+        self.t_min = t_min
+        self.step = step
+        codes = []
+        for t in range(t_min, t_max + 1, step):
+            r = self.resistance(t, a, b, c)
+            mv = vref_mv * r / (r + r_series)
+            codes.append(round((mv - 1500) / 0.15))  # 150uV/LSB, 1.5V offset
+        # Code falls with rising temperature
+        self.codes = array('h', codes)
+        self.size = len(codes)
+
+    @staticmethod
+    def resistance(t_c, a, b, c):
+        """NTC resistance at t_c from the inverted Steinhart-Hart equation."""
+        x = (a - 1 / (t_c + 273.15)) / c
+        y = math.sqrt((b / (3 * c)) ** 3 + x * x / 4)
+        return math.exp((y - x / 2) ** (1 / 3) - (y + x / 2) ** (1 / 3))
+
+    def lookup(self, code):
+        """Return the temperature in 0.1 degC for a raw code, NTC_INVALID if out of range."""
+        codes = self.codes
+        if code > codes[0] or code < codes[self.size - 1]:
+            return NTC_INVALID
+        lo = 0
+        hi = self.size - 1
+        while hi - lo > 1:
+            mid = (lo + hi) >> 1
+            if codes[mid] >= code:
+                lo = mid
+            else:
+                hi = mid
+        span = codes[lo] - codes[hi]
+        frac = 0 if span == 0 else ((codes[lo] - code) * 10 * self.step + (span >> 1)) // span
+        return (self.t_min + lo * self.step) * 10 + frac
+
+class ThermistorBank:
+    """Maps the GPIO aux channels of a chain to NTC temperatures.
+
+    gpios are the 0-based GPIO inputs (0 = GPIO1) wired to an NTC on every
+    device, results are flat over the chain, device 0 first.
+    """
+    GPIOS_PER_DEVICE = 10
+
+    def __init__(self, nr_of_devices: int = 1, gpios=(0, 1, 2, 3), table: NtcTable = None):
+        self.nr_of_devices = nr_of_devices
+        self.gpios = tuple(gpios)
+        self.table = table if table is not None else NtcTable()
+        self.temps = array('h', [NTC_INVALID] * (nr_of_devices * len(self.gpios)))
+
+    def update(self, gpio_codes):
+        """Convert raw GPIO codes (10 per device, see ADES1830.read_cycle()) into temps (0.1 degC)."""
+        k = 0
+        for device in range(self.nr_of_devices):
+            base = device * self.GPIOS_PER_DEVICE
+            for gpio in self.gpios:
+                self.temps[k] = self.table.lookup(gpio_codes[base + gpio])
+                k += 1
+        return self.temps
+
+    def celsius(self):
+        """Return the temperatures as floats in degC, None for invalid channels."""
+        return [None if t == NTC_INVALID else t / 10 for t in self.temps]
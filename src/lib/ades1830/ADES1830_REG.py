@@ -1,11 +1,12 @@
 import json
 import gc
+import struct
 
 class REGISTER:
     MAX_VALUE = 0xFFFFFFFFFFFF
     MAX_ADDRESS = 0xFFFF
 
-    def __init__(self, read_address, write_address, name, is_read_only=False, hal=None):
+    def __init__(self, read_address, write_address, name, is_read_only=False, hal=None, volatile=False, shadow=False):
         if read_address > self.MAX_ADDRESS or (write_address is not None and write_address > self.MAX_ADDRESS):
             raise ValueError("Address exceeds 16-bit max")
         self.read_address = read_address
@@ -14,21 +15,45 @@ class REGISTER:
         self.value = 0
         self.is_read_only = is_read_only or write_address is None
         self.hal = hal
+        # Shadow mode: field access uses the cached value once it is valid.
+        # Volatile registers (results, status) always bypass the cache.
+        self.volatile = volatile
+        self.shadow = shadow and not volatile
+        self.valid = False
+        self.dirty = False
+        self.deferred = False
 
     def read(self):
         if self.hal:
             self.value = self.hal.read(self.read_address)
+            self.valid = True
+            self.dirty = False
         return self.value
 
     def write(self, value):
+        """Write value to every device, or a sequence with one value per device (device 0 first).
+
+        The shadow value follows device 0, like read().
+        """
         if self.is_read_only or self.write_address is None:
             raise ValueError("Cannot write to read-only register")
-        self.value = value & self.MAX_VALUE
+        if isinstance(value, int):
+            value &= self.MAX_VALUE
+            self.value = value
+        else:
+            self.value = value[0] & self.MAX_VALUE
         if self.hal:
-            self.hal.write(self.write_address, self.value)
+            self.hal.write(self.write_address, value)
+            self.valid = True
+            self.dirty = False
+
+    def _cached(self):
+        """Return True if field access can use the shadow value."""
+        return self.shadow and self.valid
 
     def get_bits(self, bit_start, width):
-        self.read()
+        if not self._cached():
+            self.read()
         mask = (1 << width) - 1
         return (self.value >> bit_start) & mask
 
@@ -38,14 +63,71 @@ class REGISTER:
         mask = (1 << width) - 1
         if field_value > mask:
             raise ValueError("Field value exceeds width")
-        self.read()
+        if not self._cached():
+            self.read()
         self.value &= ~(mask << bit_start)
         self.value |= (field_value & mask) << bit_start
         self.value &= self.MAX_VALUE
-        if self.hal:
+        if self.shadow and self.deferred:
+            self.dirty = True
+        elif self.hal:
             self.hal.write(self.write_address, self.value)
 
-def create_register_class(name, read_address, write_address, fields, is_read_only=False):
+    def begin(self):
+        """Collect field updates in the shadow value until flush()."""
+        self.deferred = True
+
+    def flush(self):
+        """Write a pending shadow value in one transaction and stop deferring."""
+        self.deferred = False
+        if self.dirty:
+            self.write(self.value)
+
+    def refresh(self):
+        """Re-read the register from the device, dropping pending updates."""
+        self.dirty = False
+        return self.read()
+
+    def invalidate(self):
+        """Forget the shadow value, e.g. after a device reset."""
+        self.valid = False
+        self.dirty = False
+
+def parse_register_config(config):
+    """Validate one registers.json entry and return create_register_class() kwargs."""
+    if not isinstance(config, dict):
+        raise ValueError("Invalid register config")
+    name = config.get("name")
+    read_address = config.get("read_address")
+    write_address = config.get("write_address")
+    is_read_only = config.get("is_read_only", False)
+    volatile = config.get("volatile", False)
+    fields = config.get("fields", {})
+    if not all([name, read_address is not None, isinstance(fields, dict)]):
+        raise ValueError(f"Invalid config for {name}")
+    if isinstance(read_address, str) and read_address.startswith("0x"):
+        read_address = int(read_address, 16)
+    elif isinstance(read_address, str):
+        raise ValueError(f"Invalid read_address format for {name}")
+    if read_address > REGISTER.MAX_ADDRESS:
+        raise ValueError(f"read_address for {name} exceeds 16-bit max")
+    if write_address is not None:
+        if isinstance(write_address, str) and write_address.startswith("0x"):
+            write_address = int(write_address, 16)
+        elif isinstance(write_address, str):
+            raise ValueError(f"Invalid write_address format for {name}")
+        if write_address > REGISTER.MAX_ADDRESS:
+            raise ValueError(f"write_address for {name} exceeds 16-bit max")
+    return {
+        "name": name,
+        "read_address": read_address,
+        "write_address": write_address,
+        "fields": fields,
+        "is_read_only": is_read_only,
+        "volatile": volatile,
+    }
+
+def create_register_class(name, read_address, write_address, fields, is_read_only=False, volatile=False):
     # Validate fields
     for field_name, field_info in fields.items():
         bit_start = field_info.get("bit_start")
@@ -87,8 +169,10 @@ def create_register_class(name, read_address, write_address, fields, is_read_onl
         raise ValueError("Combined default exceeds 48-bit max")
 
     class NewRegister(REGISTER):
-        def __init__(self, hal=None):
-            super().__init__(read_address, write_address, name, is_read_only, hal)
+        FIELDS = tuple((field_name, info["bit_start"], info["width"]) for field_name, info in fields.items())
+
+        def __init__(self, hal=None, shadow=False):
+            super().__init__(read_address, write_address, name, is_read_only, hal, volatile, shadow)
             self.fields = fields
             self.value = initial_value & self.MAX_VALUE
 
@@ -108,11 +192,23 @@ def create_register_class(name, read_address, write_address, fields, is_read_onl
     return NewRegister
 
 class RegisterMap:
-    def __init__(self, json_file, hal=None):
-        """Initialize register map from JSON file."""
+    def __init__(self, json_file, hal=None, shadow=False, regdef=None):
+        """Initialize register map from JSON file.
+
+        With shadow=True the register instances handed out by get_register()
+        are shared and cache their value, see REGISTER.
+        regdef is a module generated by tools/gen_ades1830_regs.py, if given
+        its REGISTERS are used and json_file is not parsed at all.
+        """
         self.registers = {}
+        self.instances = {}
         self.hal = hal
-        self.load_json(json_file)
+        self.shadow = shadow
+        self._snap = None
+        if regdef is not None:
+            self.registers.update(regdef.REGISTERS)
+        else:
+            self.load_json(json_file)
 
     def load_json(self, json_file):
         """Load and parse JSON file with manual validation."""
@@ -123,46 +219,160 @@ class RegisterMap:
             raise ValueError(f"Failed to load {json_file}")
 
         for config in register_configs:
-            if not isinstance(config, dict):
-                raise ValueError("Invalid register config")
-            name = config.get("name")
-            read_address = config.get("read_address")
-            write_address = config.get("write_address")
-            is_read_only = config.get("is_read_only", False)
-            fields = config.get("fields", {})
-            if not all([name, read_address is not None, isinstance(fields, dict)]):
-                raise ValueError(f"Invalid config for {name}")
-            if isinstance(read_address, str) and read_address.startswith("0x"):
-                read_address = int(read_address, 16)
-            elif isinstance(read_address, str):
-                raise ValueError(f"Invalid read_address format for {name}")
-            if read_address > REGISTER.MAX_ADDRESS:
-                raise ValueError(f"read_address for {name} exceeds 16-bit max")
-            if write_address is not None:
-                if isinstance(write_address, str) and write_address.startswith("0x"):
-                    write_address = int(write_address, 16)
-                elif isinstance(write_address, str):
-                    raise ValueError(f"Invalid write_address format for {name}")
-                if write_address > REGISTER.MAX_ADDRESS:
-                    raise ValueError(f"write_address for {name} exceeds 16-bit max")
-            self.registers[name] = create_register_class(
-                name=name,
-                read_address=read_address,
-                write_address=write_address,
-                fields=fields,
-                is_read_only=is_read_only
-            )
+            kwargs = parse_register_config(config)
+            self.registers[kwargs["name"]] = create_register_class(**kwargs)
         gc.collect()
 
     def get_register(self, name, hal=None):
-        """Instantiate a register with optional HAL override."""
+        """Return the shared register instance, or a new one for a HAL override."""
         if name not in self.registers:
             raise ValueError(f"Register {name} not found")
-        return self.registers[name](hal=hal or self.hal)
+        if hal is not None and hal is not self.hal:
+            return self.registers[name](hal=hal)
+        reg = self.instances.get(name)
+        if reg is None:
+            reg = self.registers[name](hal=self.hal, shadow=self.shadow)
+            self.instances[name] = reg
+        return reg
+
+    def begin(self):
+        """Defer field updates of all registers until flush()."""
+        for reg in self.instances.values():
+            reg.begin()
+
+    def flush(self):
+        """Write every register with pending field updates once."""
+        for reg in self.instances.values():
+            reg.flush()
+
+    def refresh(self):
+        """Re-read all cached, non-volatile registers from the device."""
+        for reg in self.instances.values():
+            if reg.shadow:
+                reg.refresh()
+
+    def invalidate(self):
+        """Drop all shadow values, e.g. after a soft reset."""
+        for reg in self.instances.values():
+            reg.invalidate()
 
     def write_defaults(self):
         """Write default values to all writable registers."""
         for name in self.registers:
-            reg = self.get_register(name)
+            reg = self.registers[name](hal=self.hal)
             if not reg.is_read_only:
-                reg.write(reg.value)
\ No newline at end of file
+                reg.write(reg.value)
+                if name in self.instances:
+                    self.instances[name].invalidate()
+
+    SNAPSHOT_VERSION = 1
+
+    def _snapshot_layout(self):
+        """Build the read plan, field table and buffers used by snapshot()."""
+        names = tuple(self.registers)
+        plan = tuple((self.registers[name](hal=None).read_address, 6) for name in names)
+        fields = []
+        for index, name in enumerate(names):
+            for field_name, bit_start, width in self.registers[name].FIELDS:
+                fields.append((index, name + "." + field_name, bit_start, (1 << width) - 1))
+        devices = self.hal.nr_of_devices
+        self._snap = (names, plan, tuple(fields),
+                      bytearray(6 * len(names) * devices),
+                      [0] * (len(fields) * devices))
+        gc.collect()
+        return self._snap
+
+    def snapshot(self):
+        """Read every register once and decode all fields.
+
+        Returns a flat list with the value of field f of device d at
+        d * len(snapshot_fields()) + f. The list and the raw buffer behind
+        snapshot_bytes() are allocated once and overwritten by each call.
+        Shadow values of non-volatile registers are updated on the way.
+        """
+        names, plan, fields, raw, values = self._snap or self._snapshot_layout()
+        devices = self.hal.nr_of_devices
+        nregs = len(names)
+        views = self.hal.read_many(plan)
+        for index in range(nregs):
+            view = views[index]
+            for device in range(devices):
+                offset = (device * nregs + index) * 6
+                raw[offset:offset + 6] = view[device * 6:device * 6 + 6]
+        nfields = len(fields)
+        for device in range(devices):
+            base = device * nregs * 6
+            out = device * nfields
+            for f in range(nfields):
+                index, _, bit_start, mask = fields[f]
+                offset = base + index * 6
+                value = int.from_bytes(raw[offset:offset + 6], "little")
+                values[out + f] = (value >> bit_start) & mask
+        for index in range(nregs):
+            reg = self.instances.get(names[index])
+            if reg is not None and reg.shadow and not reg.dirty:
+                reg.value = int.from_bytes(raw[index * 6:index * 6 + 6], "little")
+                reg.valid = True
+        return values
+
+    def snapshot_fields(self):
+        """Return the "REGISTER.field" names in snapshot() order."""
+        fields = (self._snap or self._snapshot_layout())[2]
+        return [field[1] for field in fields]
+
+    def snapshot_dict(self, device=0):
+        """Return the last snapshot of one device as {"REGISTER.field": value}."""
+        _, _, fields, _, values = self._snap or self._snapshot_layout()
+        base = device * len(fields)
+        return {fields[f][1]: values[base + f] for f in range(len(fields))}
+
+    def snapshot_bytes(self, device=None):
+        """Serialize the last snapshot compactly.
+
+        Layout: version, number of devices and number of registers as bytes,
+        then per register its 16-bit little endian read address followed by
+        6 raw bytes per device. 11 registers of one device take 91 bytes.
+        A device index serializes that device alone (number of devices 1),
+        e.g. to keep a chain's snapshot within small link frames.
+        """
+        names, plan, _, raw, _ = self._snap or self._snapshot_layout()
+        devices = range(self.hal.nr_of_devices) if device is None else (device,)
+        nregs = len(names)
+        blob = bytearray(3 + nregs * (2 + 6 * len(devices)))
+        struct.pack_into('<BBB', blob, 0, self.SNAPSHOT_VERSION, len(devices), nregs)
+        offset = 3
+        for index in range(nregs):
+            struct.pack_into('<H', blob, offset, plan[index][0])
+            offset += 2
+            for dev in devices:
+                start = (dev * nregs + index) * 6
+                blob[offset:offset + 6] = raw[start:start + 6]
+                offset += 6
+        return blob
+
+    def decode_snapshot(self, blob):
+        """Decode snapshot_bytes() output into one {"REGISTER.field": value} dict per device.
+
+        Registers are matched by read address, unknown ones are skipped.
+        """
+        version, devices, nregs = struct.unpack_from('<BBB', blob, 0)
+        if version != self.SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}")
+        if len(blob) != 3 + nregs * (2 + 6 * devices):
+            raise ValueError("Snapshot length mismatch")
+        by_address = {}
+        for name, cls in self.registers.items():
+            by_address[cls(hal=None).read_address] = (name, cls.FIELDS)
+        result = [{} for _ in range(devices)]
+        offset = 3
+        for _ in range(nregs):
+            address = struct.unpack_from('<H', blob, offset)[0]
+            offset += 2
+            entry = by_address.get(address)
+            for device in range(devices):
+                if entry is not None:
+                    value = int.from_bytes(blob[offset:offset + 6], "little")
+                    for field_name, bit_start, width in entry[1]:
+                        result[device][entry[0] + "." + field_name] = (value >> bit_start) & ((1 << width) - 1)
+                offset += 6
+        return result
@@ -0,0 +1,232 @@
+# ADES1830_REGDEF.py
+# Generated by tools/gen_ades1830_regs.py from registers.json, do not edit.
+from ADES1830_REG import REGISTER
+
+
+class RDSID(REGISTER):
+    FIELDS = (
+        ("device_id", 0, 48),
+    )
+
+    def __init__(self, hal=None, shadow=False):
+        super().__init__(0x002C, None, "RDSID", True, hal, False, shadow)
+        self.value = 0x000000000000
+
+    def get_device_id(self):
+        return self.get_bits(0, 48)
+
+
+class CFGA(REGISTER):
+    FIELDS = (
+        ("ref_pwr_up", 7, 1),
+        ("comp_threshold", 0, 3),
+        ("iir_filter", 40, 3),
+        ("mute_discharge", 44, 1),
+        ("snapshot", 45, 1),
+    )
+
+    def __init__(self, hal=None, shadow=False):
+        super().__init__(0x0002, 0x0001, "CFGA", False, hal, False, shadow)
+        self.value = 0x050000000082
+
+    def get_ref_pwr_up(self):
+        return self.get_bits(7, 1)
+
+    def set_ref_pwr_up(self, value):
+        self.set_bits(7, 1, value)
+
+    def get_comp_threshold(self):
+        return self.get_bits(0, 3)
+
+    def set_comp_threshold(self, value):
+        self.set_bits(0, 3, value)
+
+    def get_iir_filter(self):
+        return self.get_bits(40, 3)
+
+    def set_iir_filter(self, value):
+        self.set_bits(40, 3, value)
+
+    def get_mute_discharge(self):
+        return self.get_bits(44, 1)
+
+    def set_mute_discharge(self, value):
+        self.set_bits(44, 1, value)
+
+    def get_snapshot(self):
+        return self.get_bits(45, 1)
+
+    def set_snapshot(self, value):
+        self.set_bits(45, 1, value)
+
+
+class CFGB(REGISTER):
+    FIELDS = (
+        ("undervoltage", 0, 12),
+        ("overvoltage", 12, 12),
+    )
+
+    def __init__(self, hal=None, shadow=False):
+        super().__init__(0x0026, 0x0024, "CFGB", False, hal, False, shadow)
+        self.value = 0x000000000000
+
+    def get_undervoltage(self):
+        return self.get_bits(0, 12)
+
+    def set_undervoltage(self, value):
+        self.set_bits(0, 12, value)
+
+    def get_overvoltage(self):
+        return self.get_bits(12, 12)
+
+    def set_overvoltage(self, value):
+        self.set_bits(12, 12, value)
+
+
+class RDCVA(REGISTER):
+    FIELDS = (
+        ("cell_voltage_1", 0, 16),
+        ("cell_voltage_2", 16, 16),
+        ("cell_voltage_3", 32, 16),
+    )
+
+    def __init__(self, hal=None, shadow=False):
+        super().__init__(0x0004, None, "RDCVA", True, hal, True, shadow)
+        self.value = 0x000000000000
+
+    def get_cell_voltage_1(self):
+        return self.get_bits(0, 16)
+
+    def get_cell_voltage_2(self):
+        return self.get_bits(16, 16)
+
+    def get_cell_voltage_3(self):
+        return self.get_bits(32, 16)
+
+
+class RDSTATA(REGISTER):
+    FIELDS = (
+        ("internal_temp", 16, 16),
+        ("second_voltage_ref", 0, 16),
+    )
+
+    def __init__(self, hal=None, shadow=False):
+        super().__init__(0x0030, None, "RDSTATA", True, hal, True, shadow)
+        self.value = 0x00007FFF8000
+
+    def get_internal_temp(self):
+        return self.get_bits(16, 16)
+
+    def get_second_voltage_ref(self):
+        return self.get_bits(0, 16)
+
+
+class RDSTATB(REGISTER):
+    FIELDS = (
+        ("digital_supply_voltage", 0, 16),
+        ("analog_supply_voltage", 16, 16),
+        ("reference_voltage2_res", 32, 16),
+    )
+
+    def __init__(self, hal=None, shadow=False):
+        super().__init__(0x0031, None, "RDSTATB", True, hal, True, shadow)
+        self.value = 0x7FFF7FFF7FFF
+
+    def get_digital_supply_voltage(self):
+        return self.get_bits(0, 16)
+
+    def get_analog_supply_voltage(self):
+        return self.get_bits(16, 16)
+
+    def get_reference_voltage2_res(self):
+        return self.get_bits(32, 16)
+
+
+class RDSTATC(REGISTER):
+    FIELDS = (
+        ("sleep_mode", 43, 1),
+        ("conversion_counter", 16, 16),
+    )
+
+    def __init__(self, hal=None, shadow=False):
+        super().__init__(0x0032, None, "RDSTATC", True, hal, True, shadow)
+        self.value = 0x080000000000
+
+    def get_sleep_mode(self):
+        return self.get_bits(43, 1)
+
+    def get_conversion_counter(self):
+        return self.get_bits(16, 16)
+
+
+class RDSTATD(REGISTER):
+    FIELDS = (
+        ("ov_uv_flag", 0, 32),
+    )
+
+    def __init__(self, hal=None, shadow=False):
+        super().__init__(0x0033, None, "RDSTATD", True, hal, True, shadow)
+        self.value = 0x000000000000
+
+    def get_ov_uv_flag(self):
+        return self.get_bits(0, 32)
+
+
+class RDAUXD(REGISTER):
+    FIELDS = (
+        ("string_voltage", 32, 16),
+    )
+
+    def __init__(self, hal=None, shadow=False):
+        super().__init__(0x001F, None, "RDAUXD", True, hal, True, shadow)
+        self.value = 0x000000000000
+
+    def get_string_voltage(self):
+        return self.get_bits(32, 16)
+
+
+class PWMA(REGISTER):
+    FIELDS = (
+        ("pwm", 0, 48),
+    )
+
+    def __init__(self, hal=None, shadow=False):
+        super().__init__(0x0022, 0x0020, "PWMA", False, hal, False, shadow)
+        self.value = 0x000000000000
+
+    def get_pwm(self):
+        return self.get_bits(0, 48)
+
+    def set_pwm(self, value):
+        self.set_bits(0, 48, value)
+
+
+class PWMB(REGISTER):
+    FIELDS = (
+        ("pwm", 0, 16),
+    )
+
+    def __init__(self, hal=None, shadow=False):
+        super().__init__(0x0023, 0x0021, "PWMB", False, hal, False, shadow)
+        self.value = 0x000000000000
+
+    def get_pwm(self):
+        return self.get_bits(0, 16)
+
+    def set_pwm(self, value):
+        self.set_bits(0, 16, value)
+
+
+REGISTERS = {
+    "RDSID": RDSID,
+    "CFGA": CFGA,
+    "CFGB": CFGB,
+    "RDCVA": RDCVA,
+    "RDSTATA": RDSTATA,
+    "RDSTATB": RDSTATB,
+    "RDSTATC": RDSTATC,
+    "RDSTATD": RDSTATD,
+    "RDAUXD": RDAUXD,
+    "PWMA": PWMA,
+    "PWMB": PWMB,
+}
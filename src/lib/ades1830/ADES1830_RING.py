@@ -0,0 +1,86 @@
+from array import array
+import time
+
+class SampleRing:
+    """Fixed capacity history of (ticks_us, conversion counter, raw cell codes).
+
+    A sample holds the mapped cells in logical order (ADES1830.cell_map), so
+    nr_of_cells is len(ades.cell_map), the layout of read_cycle()["codes"].
+
+    Samples are stored in preallocated arrays and addressed by age, 0 being
+    the newest. Nothing is copied on read: cells(age) returns a memoryview
+    into the ring which stays valid until that slot is overwritten.
+    """
+    def __init__(self, capacity: int = 32, nr_of_cells: int = 16):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self.nr_of_cells = nr_of_cells
+        self.ticks = array('L', [0] * capacity)
+        self.counts = array('H', [0] * capacity)
+        self.codes = array('h', [0] * (capacity * nr_of_cells))
+        codes = memoryview(self.codes)
+        self._slots = tuple(codes[i * nr_of_cells:(i + 1) * nr_of_cells] for i in range(capacity))
+        self.head = 0       # slot of the next sample
+        self.size = 0
+        self.last_count = -1
+        self._scratch = array('h', [0] * nr_of_cells)
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+        self.last_count = -1
+
+    def poll(self, ades, mode: str = "average"):
+        """Read cells and conversion counter in one burst, store if the counter advanced.
+
+        Returns True if a new sample was appended.
+        """
+        if len(ades.cell_map) != self.nr_of_cells:
+            raise ValueError(f"Ring holds {self.nr_of_cells} cells, the cell map {len(ades.cell_map)}")
+        count = ades.read_cells_counter(self._scratch, mode)
+        now = time.ticks_us()
+        if count == self.last_count:
+            return False
+        self.append(now, count, self._scratch)
+        return True
+
+    def append(self, ticks_us: int, count: int, codes):
+        """Store a sample taken elsewhere, codes is any sequence of raw cell codes."""
+        slot = self.head
+        dst = self._slots[slot]
+        for i in range(self.nr_of_cells):
+            dst[i] = codes[i]
+        self.ticks[slot] = ticks_us
+        self.counts[slot] = count
+        self.last_count = count
+        self._advance()
+
+    def _advance(self):
+        self.head = (self.head + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def _slot(self, age):
+        if age < 0 or age >= self.size:
+            raise IndexError("sample age out of range")
+        return (self.head - 1 - age) % self.capacity
+
+    def tick(self, age: int = 0):
+        return self.ticks[self._slot(age)]
+
+    def count(self, age: int = 0):
+        return self.counts[self._slot(age)]
+
+    def cells(self, age: int = 0):
+        return self._slots[self._slot(age)]
+
+    def since(self, ticks_us: int):
+        """Return how many samples were taken after ticks_us, use ages 0..n-1 to read them."""
+        n = 0
+        while n < self.size and time.ticks_diff(self.ticks[self._slot(n)], ticks_us) > 0:
+            n += 1
+        return n
@@ -73,7 +73,7 @@ async def main():
     cur = ACS71240(viout_pin=ADC_CURRENT_BAT_PIN, fault_pin=CURRENT_FAULT_PIN)
     cur.calibrate_zero()
     spi = SoftSPI(baudrate=1000000, polarity=0, phase=0, sck=Pin(SPI_SCLK_PIN), mosi=Pin(SPI_MOSI_PIN), miso=Pin(SPI_MISO_PIN))
-    vol = ADS1118(spi=spi, cs_pin = SPI_CS_PIN, channel_mux={0: 0b000, 1: 0b011}, gain=[1.0, 1.0]) #channel 0 = Bat, channel 1 = inv
+    vol = ADS1118(spi=spi, cs_pin = SPI_CS_PIN, channel_mux={0: 0b000, 1: 0b011}, gain=[1.0, 1.0], drdy=Pin(SPI_MISO_PIN, Pin.IN)) #channel 0 = Bat, channel 1 = inv
     tmp = DS18B20(data_pin=OWM_TEMP_PIN, pullup=False)
     #can= BMSCan(config_can)
     soc_estimator = BatterySOC(default_soc_cfg)
@@ -1,11 +1,16 @@
 from machine import WDT, Pin
 import asyncio
 import ADES1830
+import ADES1830_RING
+import ADES1830_DIAG
+import ADES1830_BAL
+import ADES1830_NTC
 import DS18B20
 import time
 import network
 import espnow
 import json
+import binascii
 import sys
 from collections import deque
 import requests
@@ -20,7 +25,8 @@ HW_VERSION = "1.0.0.0"
 USR_LED = 14
 ERR_LED = 4
 TEMP_OWM_PIN = 9
-MAX_NCELL = 16
+NR_OF_ADES = 1 # daisy-chained ADES1830 per slave
+MAX_NCELL = 16 * NR_OF_ADES
 #################################################################
 #  Error Handler
 #################################################################
@@ -116,14 +122,22 @@ class bms_monitor_handler():
         self.request_restart = False
 
         self.mon_temp = {}
+        self.mon_ntc_temp = []
         self.mon_vstr   = 0.0
         self.mon_vcell  = []
         self.mon_state = 0
+        self.mon_cycle = None
+        self.mon_ring = None
+        self.red_check = None
+        self.ow_sched = None
+        self.bal_coord = None
+        self.ntc = None
 
         self.inf_ncell = 0
         self.inf_ntemp = 0
         self.inf_id = 0
         self.inf_block_pos = 0
+        self.inf_iir = {}
 
         self.cfg_cell_uv = 0.8
         self.cfg_cell_ov = 3.6
@@ -134,6 +148,13 @@ class bms_monitor_handler():
         self.cfg_ext_bal_en = False
         self.cfg_bal_th = 0.2
         self.cfg_bal_start_vol = 1
+        self.cfg_red_limit_mv = 10 # max. average C-ADC vs S-ADC deviation
+        self.cfg_ow_interval_ms = 10000 # one open-wire phase (odd/even) per interval
+        self.cfg_cell_budget_us = 20000 # max. time per cell monitoring cycle, incl. measurement window
+        self.cfg_bal_settle_us = 1000 # settling time after muting discharge
+        self.cfg_ntc_gpios = (0, 1, 2, 3) # ADES1830 GPIO inputs (0 = GPIO1) wired to NTCs
+        self.cfg_iir_corner = 0.0 # on-chip IIR filter corner in Hz, 0.0 = off (averaged reads)
+        self.mon_read_mode = "average"
 
         self.sta = "off"
         self.sta_string_ov_uv = 0
@@ -156,9 +177,10 @@ class bms_monitor_handler():
                     bal_th: float = None, 
                     bal_start_voltage: float = None, 
                     bal_en: bool = None, 
-                    ext_bal_en: bool = None):
+                    ext_bal_en: bool = None,
+                    iir_corner: float = None):
         # Check types for provided parameters
-        float_params = [cell_uv, cell_ov, str_uv, str_ov, bal_th, bal_pwm, bal_start_voltage]
+        float_params = [cell_uv, cell_ov, str_uv, str_ov, bal_th, bal_pwm, bal_start_voltage, iir_corner]
         if any(x is not None and not isinstance(x, float) for x in float_params):
             raise TypeError("Voltage and threshold parameters must be floats")
         bool_params = [bal_en, ext_bal_en]
@@ -224,8 +246,21 @@ class bms_monitor_handler():
             self.cfg_bal_en = bal_en
         if ext_bal_en is not None:
             self.cfg_ext_bal_en = ext_bal_en
+
+        # On-chip IIR filter, applied right away if the ADES1830 is up
+        if iir_corner is not None:
+            if not (iir_corner == 0.0 or 0.5 <= iir_corner <= 120.0):
+                raise ValueError("IIR corner must be 0.0 (off) or between 0.5Hz and 120Hz")
+            self.cfg_iir_corner = iir_corner
+            if self.ades is not None:
+                self.__apply_iir_filter()
     def write_config(self):
         pass
+    def __apply_iir_filter(self):
+        self.ades.set_iir_corner(self.cfg_iir_corner)
+        self.inf_iir = self.ades.iir_latency()
+        self.mon_read_mode = "filtered" if self.inf_iir["corner_hz"] else "average"
+        print(f"IIR filter {self.inf_iir['corner_hz']}Hz, tau {self.inf_iir['tau_ms']}ms, t90 {self.inf_iir['t90_ms']}ms")
     def initialize(self):
         self.sta = "init"
         self.request_restart = False
@@ -233,8 +268,17 @@ class bms_monitor_handler():
         self.ds18 = DS18B20.DS18B20(data_pin=TEMP_OWM_PIN, pullup=False)
         self.inf_ntemp = len(self.ds18.get_roms())
         #Init, and get number of detected cells
-        self.ades = ADES1830.ADES1830()
+        self.ades = ADES1830.ADES1830(nr_of_devices=NR_OF_ADES)
         self.inf_ncell = self.ades.init(self.cfg_cell_ov, self.cfg_cell_uv)
+        self.__apply_iir_filter()
+        self.mon_ring = ADES1830_RING.SampleRing(capacity=32, nr_of_cells=len(self.ades.cell_map))
+        self.red_check = ADES1830_DIAG.RedundancyCheck(self.ades, limit_mv=self.cfg_red_limit_mv)
+        self.ow_sched = ADES1830_DIAG.OpenWireScheduler(self.ades, interval_ms=self.cfg_ow_interval_ms,
+                                                        budget_us=self.cfg_cell_budget_us,
+                                                        suspend=self.red_check.stop,
+                                                        resume=lambda: self.red_check.start(continuous=True))
+        self.ntc = ADES1830_NTC.ThermistorBank(self.ades.nr_of_devices, gpios=self.cfg_ntc_gpios)
+        self.bal_coord = ADES1830_BAL.BalanceCoordinator(self.ades, settle_us=self.cfg_bal_settle_us, mode="average")
         # Get device ID   
         self.inf_id = self.ades.get_device_id()
         self.inf_block_pos = 0 #TODO: Read in block position from DIP switches
@@ -242,22 +286,59 @@ class bms_monitor_handler():
     # Monitors cell voltages
     async def __mon_cell_task(self):
         print("Run cell monitoring task")
-        self.ades.start_cell_volt_conv(redundant=False, continuous=True, discharge_permitted=False, reset_filter=False, openwire=0)
-        #ades.start_s_adc_conv(continuous=True, discharge_permitted=False, openwire=0)
+        # Redundant mode: the S-ADC converts alongside the C-ADC for the cross-check
+        self.red_check.start(continuous=True)
         while True:
-            # Read sensors
-            self.mon_vcell = self.ades.get_all_cell_voltages(mode="average")
+            # Make sure a new average is available, then read cells, string
+            # voltage, conversion counter and flags in one burst
+            try:
+                await self.ades.wait_conversion("counter", timeout_ms=50)
+            except asyncio.TimeoutError:
+                pass # a stalled counter is reported by the state task
+            start = time.ticks_us()
+            # Read inside a muted window so balancing current does not bias the cells,
+            # keep a deduplicated, timestamped history of the logical cell codes
+            try:
+                self.mon_cycle = await self.bal_coord.window(self.__read_cells)
+            except asyncio.TimeoutError:
+                self.err.handle_error('warning', "No fresh conversions in measurement window")
+                await asyncio.sleep(1)
+                continue
+            self.mon_vcell = self.mon_cycle["vcell"]
+            self.mon_vstr = self.mon_cycle["vstr"]
+            # GPIO codes come from the last ADAX of the aux task
+            self.ntc.update(self.mon_cycle["gpio"])
+            self.mon_ntc_temp = self.ntc.celsius()
+            # S-ADC results belong to the open-wire check while a phase runs
+            if not self.ow_sched.busy and self.red_check.update() > 0:
+                self.err.handle_error('warning', f"C-ADC/S-ADC mismatch on cells {self.red_check.faulty_cells()}")
+            if self.ow_sched.step(time.ticks_diff(time.ticks_us(), start)) and self.ow_sched.open_cells():
+                self.err.handle_error('error', f"Open wire on cells {self.ow_sched.open_cells()}")
+            if self.ow_sched.timeouts:
+                self.err.handle_error('warning', f"Open-wire phase timeouts: {self.ow_sched.timeouts}")
+                self.ow_sched.timeouts = 0
             # wait before next reading
             await asyncio.sleep(1) # Average updates every 8ms
 
+    def __read_cells(self):
+        # The IIR would need its t99 muted to forget the balancing drop, windows read averages
+        cycle = self.ades.read_cycle(mode=self.bal_coord.read_mode(self.mon_read_mode), gpio=True)
+        # the history holds the logical cells of this very read, once per conversion
+        if cycle["conv_cnt"] != self.mon_ring.last_count:
+            self.mon_ring.append(time.ticks_us(), cycle["conv_cnt"], cycle["codes"])
+        return cycle
+
    # Monitor Auxilary measurements
     async def __mon_aux_task(self):
         print("Run aux monitoring task")
         while True:
+            # String voltage is read by the cell task together with the cells
             self.ades.start_aux_adc_conv(openwire=False, pullup=False)
             #ades.start_aux2_adc_conv()
-            await asyncio.sleep_ms(1) #taux = 1ms conversion time
-            self.mon_vstr = self.ades.get_string_voltage()
+            try:
+                await self.ades.wait_conversion("aux")
+            except asyncio.TimeoutError:
+                self.err.handle_error('warning', "Aux conversion timeout")
             await asyncio.sleep(1) 
 
     async def __mon_temp_task(self):
@@ -270,8 +351,11 @@ class bms_monitor_handler():
     async def __mon_state_task(self):
         print("Run ADES1830 state monitoring task")
         while True:
+            if self.mon_cycle is None:
+                await asyncio.sleep(1)
+                continue
             # check conversion counter
-            self.sta_conv_cnt.append(self.ades.get_conversion_counter())
+            self.sta_conv_cnt.append(self.mon_cycle["conv_cnt"])
             print(f"conversion counter {self.sta_conv_cnt}")
             if len(self.sta_conv_cnt) > 3:
                 self.sta_conv_cnt.pop(0)
@@ -279,8 +363,14 @@ class bms_monitor_handler():
                     self.request_restart = True
                     self.err.handle_error('warning', f"Restart requested, reason: conversiont counter stalled")
 
+            # check SPI link, single bad frames are absorbed by HAL retries
+            link = self.ades.hal.stats()
+            if link["failures"] or link["cc_mismatches"]:
+                self.err.handle_error('warning', f"ADES1830 link errors: {link}")
+                self.ades.hal.reset_stats()
+
             # check OV UV flags    
-            self.sta_cell_ov, self.sta_cell_uv = self.ades.get_ov_uv_flag()
+            self.sta_cell_ov, self.sta_cell_uv = self.mon_cycle["ov"], self.mon_cycle["uv"]
             if all(x == 0 for x in self.sta_cell_ov) and all(x == 0 for x in self.sta_cell_ov):
                 self.sta_cell_ov_uv = 0
             else:
@@ -296,11 +386,12 @@ class bms_monitor_handler():
         while True:
             bal_pwm = [0] * MAX_NCELL
             if self.cfg_bal_en == 1:
+                # mon_vcell is in logical cell order, PWM is per ADES channel
                 for i, cell in enumerate(self.mon_vcell):
                     if cell > self.cfg_bal_start_vol:
-                        bal_pwm[i] = self.cfg_bal_pwm
+                        bal_pwm[self.ades.cell_map[i]] = self.cfg_bal_pwm
                     else:
-                        bal_pwm[i] = 0
+                        bal_pwm[self.ades.cell_map[i]] = 0
 
                 #if (max(self.mon_vcell) - min(self.mon_vcell)) >= self.cfg_bal_th and (max(self.mon_vcell) > self.cfg_cell_uv):
                 #    max_index = self.mon_vcell.index(max(self.mon_vcell))   
@@ -312,12 +403,15 @@ class bms_monitor_handler():
             if bal_pwm != self.sta_bal_pwm :
                 try:
                     print(f"Change balancing pwm to: {bal_pwm}")
-                    pwm = self.ades.set_pwm(bal_pwm)
+                    pwm = self.bal_coord.set_pwm(bal_pwm)
                     assert pwm == bal_pwm 
                 except Exception as err:
                     self.err.handle_error('error', f"Set PWM ADES1830 error: {err}")
 
             self.sta_bal_pwm = bal_pwm
+            if self.bal_coord.active:
+                print(f"Balancing duty lost to measurement: {self.bal_coord.lost_duty() * 100:.1f}%")
+            self.bal_coord.reset_stats()
 
             # TODO implement external balancing
             if self.cfg_ext_bal_en == 1:
@@ -375,7 +469,8 @@ class bms_monitor_handler():
             "fw_ver": FW_VERSION,
             "hw_ver": HW_VERSION,
             "ncell": self.inf_ncell,
-            "ntemp": self.inf_ntemp
+            "ntemp": self.inf_ntemp,
+            "iir": self.inf_iir
         }
     def get_status(self):
         return self.__to_dict_status()
@@ -387,6 +482,13 @@ class bms_monitor_handler():
             "cell_ov": self.sta_cell_ov,
             "cell_uv": self.sta_cell_uv
         }
+    def get_health(self):
+        # One message per device: a chain's snapshot does not fit one ESP-NOW frame
+        return [{
+            "type": "hlt",
+            "dev": device,
+            "snap": binascii.b2a_base64(blob, newline=False).decode()
+        } for device, blob in enumerate(self.ades.health_snapshot(per_device=True))]
     def get_config(self):
         return self.__to_dict_config()
     def __to_dict_config(self):
@@ -400,7 +502,8 @@ class bms_monitor_handler():
             "bal_th": self.cfg_bal_th,
             "bal_en": self.cfg_bal_en,
             "ext_bal_en": self.cfg_ext_bal_en,
-            "bal_pwm" : self.cfg_bal_pwm
+            "bal_pwm" : self.cfg_bal_pwm,
+            "iir_corner": self.cfg_iir_corner
         }
     def set_config(self, config):
         self.__from_dict_config(config)
@@ -415,6 +518,7 @@ class bms_monitor_handler():
         cfg_bal_en                     = config_dict.get("bal_en", self.cfg_bal_en)
         cfg_ext_bal_en                 = config_dict.get("ext_bal_en", self.cfg_ext_bal_en)
         cfg_bal_pwm                    = config_dict.get("bal_pwm" , self.cfg_bal_pwm)
+        cfg_iir_corner                 = config_dict.get("iir_corner", self.cfg_iir_corner)
         self.configure(cell_uv          = cfg_cell_uv,
                        cell_ov          = cfg_cell_ov,
                        str_uv           = cfg_str_uv, 
@@ -423,7 +527,8 @@ class bms_monitor_handler():
                        bal_th           = cfg_bal_th,
                        bal_start_voltage= cfg_bal_start_vol,
                        bal_en           = cfg_bal_en,
-                       ext_bal_en       = cfg_ext_bal_en)      
+                       ext_bal_en       = cfg_ext_bal_en,
+                       iir_corner       = cfg_iir_corner)      
         
     def __pwm_percentage_to_hex(pwm_percentage: float) -> int:
         if not isinstance(pwm_percentage, (int, float)):
@@ -449,6 +554,7 @@ class bms_command_handler:
             "get_status"         : self.get_status,
             "get_data"           : self.get_data,
             "get_config"         : self.get_config,
+            "get_health"         : self.get_health,
             "reboot"             : self.reboot,
             "soft_reset"         : self.soft_reset,
             "update_fw"          : self.update_fw
@@ -528,15 +634,23 @@ class bms_command_handler:
                         print("Unknown data reveived")
                     if self.error.has_error:
                         response = self.error.get_error()
-                    # 3. serialize response to JSON
-                    json_str = json.dumps(response)
-                    # 4. encode JSON to bytes
-                    data_bytes = json_str.encode('utf-8')
-                    # 5. send data_bytes to master using ESPNow
-                    self.e.send(self.master, data_bytes)
+                    self.__send_response(response)
             else:
                 await asyncio.sleep_ms(10)       
 
+    def __send_response(self, response):
+        # A list holds several messages (e.g. health per device), each gets its own frame
+        for msg in (response if isinstance(response, list) else (response,)):
+            # 3. serialize response to JSON
+            json_str = json.dumps(msg)
+            # 4. encode JSON to bytes
+            data_bytes = json_str.encode('utf-8')
+            if len(data_bytes) > espnow.MAX_DATA_LEN:
+                self.error.handle_error('error', f"Response of {len(data_bytes)} bytes exceeds the ESP-NOW payload of {espnow.MAX_DATA_LEN}")
+                continue
+            # 5. send data_bytes to master using ESPNow
+            self.e.send(self.master, data_bytes)
+
     async def __sim_master_task(self):
         while True:
             self.turn_on_led()
@@ -605,6 +719,9 @@ class bms_command_handler:
  
     def get_config(self):
        return self.monitor.get_config()
+
+    def get_health(self):
+       return self.monitor.get_health()
     
     def reboot(self):
        machine.reboot()
@@ -101,12 +101,21 @@ async def main():
     #    adcs.append(ADS1118(spi=spi, demux=demux, demux_output=0xB, pga=2, dr=4, channel_mux=mux, gain=[1.0, 1.0, 1.0]))
     #    adcs.append(ADS1118(spi=spi, demux=demux, demux_output=0x0, pga=2, dr=4, channel_mux={0: 0b000, 1: 0b011}, gain=[1.0, 1.0]))
     
+    # 475 SPS with median-of-3 decimation: less noise than 128 SPS at a shorter sweep,
+    # see tools/bench_ads1118_oversampling.py
+    #for adc in adcs:
+    #    adc.set_data_rate(6)
+    #    for ch in range(adc.nr_of_ch):
+    #        adc.set_oversampling(ch, 3, median=True)
+    #scanner = ADS1118Scanner(adcs)
+
     # Optional: Calibrate all ADCs once at startup (assuming inputs shorted)
     #if str_addr == 0:
     #    log.info(f"Calibrating ADCs...", ctx="boot")
     #    for adc in adcs:
     #        for ch in range(adc.nr_of_ch):
-    #            await adc.calibrate(ch)
+    #            await adc.calibrate(ch, save=False)
+    #    adcs[0].cal_store.save()
     #    log.info(f"ADC Calibration complete.", ctx="boot")
     #    while True:
     #        log.info("Calibration done. Slave in standby mode for address 0. Set address via STR_SEL pins and restart.", ctx="boot")
@@ -136,7 +145,7 @@ async def main():
     even_odd_flag = False
     while True:
         # Read voltages
-        #voltages = await read_all_adc()
+        #voltages = await read_all_adc(scanner)
         #log.info(f"Cell Voltages: {voltages}", ctx="main")
         #cell_voltages_1 = voltages[0:15]
         #string_voltage_1 = voltages[16]
@@ -167,48 +176,20 @@ async def main():
         #        pca.all_off()
         await asyncio.sleep(1)
 
-async def read_all_adc(adcs):
+async def read_all_adc(scanner):
     """
-    Asynchronously reads all ADC channels from all ADS1118 instances and returns their voltages as a list.
+    Run one pipelined sweep over all ADS1118 channels and return their voltages.
+
+    The result is indexed by channel position over all ADCs in construction
+    order, see ADS1118Scanner. At dr=4 (128 SPS) a sweep of 12 ADCs x 3
+    channels takes 3 conversions, ~26 ms with the oscillator margin.
     """
-    num_adcs = len(adcs)
-    total_channels = 0
-    max_channels = 0
-    for adc in adcs:
-        total_channels = total_channels + adc.nr_of_ch
-        max_channels = adc.nr_of_ch if adc.nr_of_ch > max_channels else max_channels
-    vol = [0] * total_channels
-    
-    # Initialize pipeline
-    for adc in adcs:
-        try:
-            await adc.start_conversions_all(channel=0, ret=False)
-        except Exception as e:
-            print(f"Error initializing ADC: {e}")
-
-    # Read all channels
-    for j in range(max_channels):
-        prev_nr_of_ch = 0
-        for i, adc in enumerate(adcs):
-            if j <= adc.nr_of_ch - 1:
-                try:
-                    vol[j + i * prev_nr_of_ch] = await adc.start_conversions_all(channel=j, ret=True)
-                except Exception as e:
-                    print(f"Error reading ADC {i} channel {j}: {e}")
-                    vol[j + i * prev_nr_of_ch] = None
-            else:
-                pass
-            prev_nr_of_ch = adc.nr_of_ch
-
-        #wait to complete conversion.
-        # SPI @1MHz and 2 bytes takes adc_read_time = ~100us (16us for 2 bytes, rest overhead)
-        # @ 128 SPS every ~8ms a new value
-        # --> one round trip should at least last: 10ms
-        # whitout delay: nr_of_adcs * adc_read_time
-        await asyncio.sleep(adc.get_conversion_delay() - (num_adcs * 0.0001))
-    # total roundtrip time = num_channels * (conversion_delay - (nr_of_adcs * adc_read_time))
-    # trt = ~70ms
-    return vol
+    voltages = await scanner.sweep()
+    stats = scanner.stats()
+    if any(stats["errors"]):
+        log.warn(f"ADC scan errors: {stats['errors']}", ctx="adc")
+        scanner.reset_stats()
+    return voltages
 
 def read_string_address():
     """Read 4-bit address from GPIO pins (0-15)"""
@@ -0,0 +1,702 @@
+"""
+Host-side emulator of an ADES1830 daisy chain at the SPI frame level.
+
+ADES1830Emulator has the write()/readinto() interface of machine.SoftSPI, so
+it plugs into ADES1830_HAL.HAL(spi=...) and the whole driver stack runs on
+Linux. It checks the PEC15 of every command and the PEC10 of every write,
+keeps a command counter per device, holds the configuration registers of
+registers.json and produces cell, S-ADC, aux and status results from
+synthetic cell voltages with the conversion timing of the device: C-ADC and
+S-ADC conversions complete every C_CONV_US, the averaged results are the mean
+of the last 8 conversions and the IIR filter is a single pole with the
+corner selected in CFGA.
+
+VirtualClock replaces time.ticks_*() and sleep_*() with a simulated clock
+that also advances by the SPI transfer time, so busy-wait loops terminate and
+runs are deterministic.
+
+    from ades1830_emu import ADES1830Emulator, VirtualClock, make_hal
+    clock = VirtualClock().install()
+    emu = ADES1830Emulator(nr_of_devices=2, clock=clock)
+    ades = ADES1830(hal=make_hal(emu))
+
+    python tools/ades1830_emu.py   # self check against the driver
+"""
+import asyncio
+import binascii
+import json
+import math
+import random
+import struct
+import sys
+import time
+
+from bench_ades1830_hal import ADES_DIR, install_fake_machine
+
+CELLS = 16
+GPIOS = 10
+
+
+def _crc_table(poly, width):
+    top = 1 << (width - 1)
+    mask = (1 << width) - 1
+    table = []
+    for i in range(256):
+        crc = i << (width - 8)
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) if crc & top else (crc << 1)
+        table.append(crc & mask)
+    return table
+
+
+_PEC15 = _crc_table(0x4599, 15)
+_PEC10 = _crc_table(0x08F, 10)
+
+
+def pec15(data):
+    """PEC15 of a command, polynomial 0x4599, seed 0x10, returned shifted left by one."""
+    crc = 0x10
+    for byte in data:
+        crc = ((crc << 8) ^ _PEC15[((crc >> 7) ^ byte) & 0xFF]) & 0x7FFF
+    return crc << 1
+
+
+def pec10(data, command_counter=0):
+    """PEC10 of a data frame followed by the 6 command counter bits."""
+    crc = 0x10
+    for byte in data:
+        crc = ((crc << 8) ^ _PEC10[((crc >> 2) ^ byte) & 0xFF]) & 0x3FF
+    for bit in range(5, -1, -1):
+        feedback = ((crc >> 9) & 1) ^ ((command_counter >> bit) & 1)
+        crc = (crc << 1) & 0x3FF
+        if feedback:
+            crc ^= 0x08F
+    return crc
+
+
+class RealClock:
+    """Host monotonic clock in microseconds."""
+
+    def now_us(self):
+        return time.perf_counter_ns() // 1000
+
+    def advance(self, us):
+        pass
+
+    def install(self):
+        """Provide the MicroPython time/asyncio functions the driver uses if missing."""
+        _install_time(
+            ticks_us=self.now_us,
+            sleep_us=lambda us: time.sleep(us / 1e6),
+            sleep_ms=lambda ms: time.sleep(ms / 1e3),
+            async_sleep_ms=lambda ms: asyncio.sleep(ms / 1e3),
+            force=False,
+        )
+        return self
+
+
+class VirtualClock:
+    """Simulated microsecond clock, sleeps and SPI transfers advance it."""
+
+    def __init__(self, start_us=0):
+        self.us = start_us
+
+    def now_us(self):
+        return self.us
+
+    def advance(self, us):
+        self.us += us
+
+    def install(self):
+        """Route time.ticks_*(), time.sleep_*() and asyncio.sleep_ms() to this clock."""
+
+        def sleep_us(us):
+            self.us += us
+
+        def sleep_ms(ms):
+            self.us += ms * 1000
+
+        async def async_sleep_ms(ms):
+            self.us += ms * 1000
+            await asyncio.sleep(0)
+
+        _install_time(ticks_us=self.now_us, sleep_us=sleep_us, sleep_ms=sleep_ms,
+                      async_sleep_ms=async_sleep_ms, force=True)
+        return self
+
+
+def _install_time(ticks_us, sleep_us, sleep_ms, async_sleep_ms, force):
+    funcs = {
+        "ticks_us": ticks_us,
+        "ticks_ms": lambda: ticks_us() // 1000,
+        "ticks_diff": lambda a, b: a - b,
+        "ticks_add": lambda a, b: a + b,
+        "sleep_us": sleep_us,
+        "sleep_ms": sleep_ms,
+    }
+    for name, fn in funcs.items():
+        if force or not hasattr(time, name):
+            setattr(time, name, fn)
+    if force or not hasattr(asyncio, "sleep_ms"):
+        asyncio.sleep_ms = async_sleep_ms
+
+
+def load_register_defaults():
+    """Return {read_address: (write_address, default)} for the writable registers of registers.json."""
+    if str(ADES_DIR) not in sys.path:
+        sys.path.insert(0, str(ADES_DIR))
+    from ADES1830_REG import create_register_class, parse_register_config
+
+    with open(ADES_DIR / "registers.json", "r") as f:
+        configs = json.load(f)
+    defaults = {}
+    for config in configs:
+        kwargs = parse_register_config(config)
+        if kwargs["is_read_only"] or kwargs["write_address"] is None:
+            continue
+        defaults[kwargs["read_address"]] = (kwargs["write_address"], create_register_class(**kwargs)().value)
+    return defaults
+
+
+class _Device:
+    """State of one ADES1830 in the chain."""
+
+    def __init__(self, index, defaults):
+        self.index = index
+        self.defaults = defaults
+        self.cells_mv = [3700.0] * CELLS
+        self.gpio_mv = [1500.0] * GPIOS
+        self.broken_taps = set()     # 0-based cells whose tap is open
+        self.reset()
+
+    def reset(self):
+        self.regs = {read: value for read, (_, value) in self.defaults.items()}
+        self.write_map = {write: read for read, (write, _) in self.defaults.items()}
+        self.cc = 0
+        cleared = [-0x8000] * CELLS
+        self.c = list(cleared)
+        self.s = list(cleared)
+        self.avg = list(cleared)
+        self.filt = list(cleared)
+        self.history = []            # last 8 C-ADC conversions
+        self.aux = [-0x8000] * GPIOS
+        self.vstr = -0x8000
+        self.flags = 0
+        self.count = 0
+        self.frozen = None
+
+    def bump_cc(self):
+        self.cc = self.cc + 1 if self.cc < 63 else 1
+
+    def results(self):
+        """Result set reads are served from, the frozen copy while SNAP is active."""
+        return self.frozen if self.frozen is not None else (self.c, self.s, self.avg, self.filt, self.aux, self.vstr, self.flags, self.count)
+
+    def freeze(self):
+        self.frozen = (list(self.c), list(self.s), list(self.avg), list(self.filt), list(self.aux), self.vstr, self.flags, self.count)
+
+    def pwm(self, cell):
+        """Balancing duty 0-15 of a cell from PWMA/PWMB, even cell in the high nibble."""
+        if cell < 12:
+            word = self.regs.get(0x022, 0)
+        else:
+            word = self.regs.get(0x023, 0)
+            cell -= 12
+        return (word >> (((cell >> 1) << 3) + (0 if cell & 1 else 4))) & 0xF
+
+
+class ADES1830Emulator:
+    """SPI-level model of nr_of_devices daisy-chained ADES1830.
+
+    Pass as spi to ADES1830_HAL.HAL. cells_mv/gpio_mv/broken_taps of each
+    device in devices set the synthetic inputs, noise_uv adds gaussian noise
+    and bal_drop_mv is the voltage drop a cell shows at full balancing duty
+    while discharge is not muted.
+    """
+    C_CONV_US = 1000     # one C-ADC (and S-ADC) conversion of all cells
+    AUX_CONV_US = 1500
+    SPI_BIT_US = 1       # 1 MHz SPI
+    AVG_DEPTH = 8
+    IIR_CORNER_HZ = (0, 110, 45, 21, 10, 5, 1.25, 0.625)
+
+    CELL_GROUPS = {      # read command -> (result index, first cell, cells)
+        0x004: (0, 0, 3), 0x006: (0, 3, 3), 0x008: (0, 6, 3), 0x00A: (0, 9, 3), 0x009: (0, 12, 3), 0x00B: (0, 15, 1),
+        0x003: (1, 0, 3), 0x005: (1, 3, 3), 0x007: (1, 6, 3), 0x00D: (1, 9, 3), 0x00E: (1, 12, 3), 0x00F: (1, 15, 1),
+        0x044: (2, 0, 3), 0x046: (2, 3, 3), 0x048: (2, 6, 3), 0x04A: (2, 9, 3), 0x049: (2, 12, 3), 0x04B: (2, 15, 1),
+        0x012: (3, 0, 3), 0x013: (3, 3, 3), 0x014: (3, 6, 3), 0x015: (3, 9, 3), 0x016: (3, 12, 3), 0x017: (3, 15, 1),
+        0x00C: (0, 0, 16), 0x010: (1, 0, 16), 0x04C: (2, 0, 16), 0x018: (3, 0, 16),
+    }
+    AUX_GROUPS = {0x019: 0, 0x01A: 3, 0x01B: 6}
+    POLLS = {0x718: "any", 0x71C: "cell", 0x71D: "s", 0x71E: "aux", 0x71F: "aux2"}
+
+    def __init__(self, nr_of_devices=1, clock=None, noise_uv=0, bal_drop_mv=0, seed=1830):
+        self.nr_of_devices = nr_of_devices
+        self.clock = clock if clock is not None else RealClock()
+        self.noise_uv = noise_uv
+        self.bal_drop_mv = bal_drop_mv
+        self.rng = random.Random(seed)
+        defaults = load_register_defaults()
+        self.devices = [_Device(i, defaults) for i in range(nr_of_devices)]
+        self.pending = None          # read or poll command waiting for readinto()
+        self.corrupt = []            # device indices whose next responses get a bad PEC
+        # statistics
+        self.transactions = 0
+        self.commands = 0
+        self.reads = 0
+        self.writes = 0
+        self.polls = 0
+        self.bytes = 0
+        self.pec_errors = 0
+        self._reset_converters()
+
+    def _reset_converters(self):
+        self.c_continuous = False
+        self.c_redundant = False
+        self.c_next_us = None        # completion time of the next C-ADC conversion
+        self.s_continuous = False
+        self.s_next_us = None
+        self.s_ow = 0
+        self.aux_done_us = None
+        self.aux2_done_us = None
+        self.muted = False
+
+    def reset_stats(self):
+        self.transactions = self.commands = self.reads = self.writes = self.polls = self.bytes = self.pec_errors = 0
+
+    def inject_pec_error(self, device=0, count=1):
+        """Corrupt the PEC of the next count read responses of a device."""
+        self.corrupt.extend([device] * count)
+
+    # -- SPI interface ------------------------------------------------------
+
+    def write(self, buf):
+        self.clock.advance(len(buf) * 8 * self.SPI_BIT_US)
+        self.bytes += len(buf)
+        self._update()
+        if len(buf) < 4:
+            return
+        code = ((buf[0] & 0x07) << 8) | buf[1]
+        if pec15(bytes(buf[0:2])) != ((buf[2] << 8) | buf[3]):
+            self.pec_errors += 1
+            self.pending = None
+            return
+        self.transactions += 1
+        if len(buf) > 4:
+            self._write_data(code, buf)
+        elif code in self.POLLS:
+            self.polls += 1
+            self.pending = code
+        elif self._is_read(code):
+            self.reads += 1
+            self.pending = code
+        else:
+            self.commands += 1
+            self._command(code)
+
+    def readinto(self, buf):
+        self.clock.advance(len(buf) * 8 * self.SPI_BIT_US)
+        self.bytes += len(buf)
+        self._update()
+        code = self.pending
+        self.pending = None
+        if code is None:
+            for i in range(len(buf)):
+                buf[i] = 0xFF
+            return
+        if code in self.POLLS:
+            value = 0xFF if self._poll_done(self.POLLS[code]) else 0x00
+            for i in range(len(buf)):
+                buf[i] = value
+            return
+        n = self.nr_of_devices
+        length = len(buf) // n - 2
+        for index in range(n):
+            device = self.devices[index]
+            data = self._read_data(device, code, length)
+            offset = index * (length + 2)
+            buf[offset:offset + length] = data
+            pec = pec10(data, device.cc)
+            if index in self.corrupt:
+                self.corrupt.remove(index)
+                pec ^= 0x001
+            buf[offset + length] = (device.cc << 2) | ((pec >> 8) & 0x03)
+            buf[offset + length + 1] = pec & 0xFF
+
+    # -- command decoding ---------------------------------------------------
+
+    def _is_read(self, code):
+        return (code in self.CELL_GROUPS or code in self.AUX_GROUPS
+                or code in (0x01F, 0x02C, 0x030, 0x031, 0x032, 0x033, 0x034)
+                or code in self.devices[0].regs)
+
+    def _write_data(self, code, buf):
+        self.writes += 1
+        n = self.nr_of_devices
+        for i in range(n):
+            frame = bytes(buf[4 + 8 * i:12 + 8 * i])
+            # data shifts through the chain, the first frame reaches the farthest device
+            device = self.devices[n - 1 - i]
+            if len(frame) < 8 or pec10(frame[0:6]) != (((frame[6] & 0x03) << 8) | frame[7]):
+                self.pec_errors += 1
+                continue
+            value = int.from_bytes(frame[0:6], "little")
+            device.bump_cc()
+            if code in device.write_map:
+                device.regs[device.write_map[code]] = value
+            elif code in (0x715, 0x717):  # CLOVUV, CLRFLAG
+                device.flags &= ~value & 0xFFFFFFFF
+
+    def _command(self, code):
+        now = self.clock.now_us()
+        for device in self.devices:
+            device.bump_cc()
+        if code & ~0x197 == 0x260:  # ADCV
+            self.c_redundant = bool(code & 0x100)
+            self.c_continuous = bool(code & 0x080)
+            if code & 0x004:
+                for device in self.devices:
+                    device.filt = list(device.c)
+            self.c_next_us = now + self.C_CONV_US
+            if self.c_redundant:
+                self.s_ow = 0
+                self.s_continuous = self.c_continuous
+                self.s_next_us = self.c_next_us
+        elif code & ~0x093 == 0x068:  # ADSV
+            self.s_continuous = bool(code & 0x080)
+            self.s_ow = code & 0x003
+            self.s_next_us = now + self.C_CONV_US
+        elif code & ~0x1CF == 0x410:  # ADAX
+            self.aux_done_us = now + self.AUX_CONV_US
+        elif code & ~0x00F == 0x400:  # ADAX2
+            self.aux2_done_us = now + self.AUX_CONV_US
+        elif code == 0x027:  # SRST
+            for device in self.devices:
+                device.reset()
+            self._reset_converters()
+        elif code == 0x02E:  # RSTCC
+            for device in self.devices:
+                device.cc = 0
+        elif code == 0x02D:  # SNAP
+            for device in self.devices:
+                device.freeze()
+        elif code == 0x02F:  # UNSNAP
+            for device in self.devices:
+                device.frozen = None
+        elif code == 0x028:  # MUTE
+            self.muted = True
+        elif code == 0x029:  # UNMUTE
+            self.muted = False
+        elif code == 0x711:  # CLRCELL
+            for device in self.devices:
+                device.c = [-0x8000] * CELLS
+                device.avg = [-0x8000] * CELLS
+        elif code == 0x714:  # CLRFC
+            for device in self.devices:
+                device.filt = [-0x8000] * CELLS
+        elif code == 0x712:  # CLRAUX
+            for device in self.devices:
+                device.aux = [-0x8000] * GPIOS
+                device.vstr = -0x8000
+        elif code == 0x716:  # CLRSPIN
+            for device in self.devices:
+                device.s = [-0x8000] * CELLS
+
+    def _poll_done(self, kind):
+        now = self.clock.now_us()
+        busy = {
+            "cell": not self.c_continuous and self.c_next_us is not None and now < self.c_next_us,
+            "s": not self.s_continuous and self.s_next_us is not None and now < self.s_next_us,
+            "aux": self.aux_done_us is not None and now < self.aux_done_us,
+            "aux2": self.aux2_done_us is not None and now < self.aux2_done_us,
+        }
+        if kind == "any":
+            return not any(busy.values())
+        return not busy[kind]
+
+    # -- conversions --------------------------------------------------------
+
+    def _update(self):
+        """Run all conversions that completed up to now."""
+        now = self.clock.now_us()
+        if self.c_next_us is not None and now >= self.c_next_us:
+            n = (now - self.c_next_us) // self.C_CONV_US + 1 if self.c_continuous else 1
+            # Only the last conversions can still be seen in the results
+            for _ in range(min(n, 64)):
+                self._convert_c()
+            for device in self.devices:
+                device.count = (device.count + n - min(n, 64)) & 0x3FFF
+            self.c_next_us = self.c_next_us + n * self.C_CONV_US if self.c_continuous else None
+        if self.s_next_us is not None and now >= self.s_next_us and not self.c_redundant:
+            self._convert_s()
+            self.s_next_us = self.s_next_us + self.C_CONV_US if self.s_continuous else None
+        elif self.c_redundant:
+            self.s_next_us = self.c_next_us
+        if self.aux_done_us is not None and now >= self.aux_done_us:
+            self._convert_aux()
+            self.aux_done_us = None
+        if self.aux2_done_us is not None and now >= self.aux2_done_us:
+            self.aux2_done_us = None
+
+    def _cell_code(self, device, cell, mv):
+        if not self.muted and self.bal_drop_mv:
+            mv -= self.bal_drop_mv * device.pwm(cell) / 15
+        if self.noise_uv:
+            mv += self.rng.gauss(0, self.noise_uv / 1000)
+        return max(-0x8000, min(0x7FFF, round((mv - 1500) / 0.15)))
+
+    def _convert_c(self):
+        for device in self.devices:
+            device.c = [self._cell_code(device, i, device.cells_mv[i]) for i in range(CELLS)]
+            device.history.append(device.c)
+            if len(device.history) > self.AVG_DEPTH:
+                device.history.pop(0)
+            depth = len(device.history)
+            device.avg = [round(sum(h[i] for h in device.history) / depth) for i in range(CELLS)]
+            fc = (device.regs.get(0x002, 0) >> 40) & 0x7
+            if fc == 0 or device.filt[0] == -0x8000:
+                device.filt = [float(x) for x in device.c]
+            else:
+                # single pole with the corner of IIR_CORNER_HZ[fc] at the conversion rate
+                alpha = 1 - math.exp(-2 * math.pi * self.IIR_CORNER_HZ[fc] * self.C_CONV_US / 1e6)
+                device.filt = [device.filt[i] + alpha * (device.c[i] - device.filt[i]) for i in range(CELLS)]
+            if self.c_redundant:
+                device.s = [self._cell_code(device, i, device.cells_mv[i]) for i in range(CELLS)]
+            self._check_ov_uv(device)
+            device.count = (device.count + 1) & 0x3FFF
+
+    def _convert_s(self):
+        for device in self.devices:
+            codes = []
+            for i in range(CELLS):
+                mv = device.cells_mv[i]
+                pulled = self.s_ow == 3 or (self.s_ow == 1 and i & 1) or (self.s_ow == 2 and not i & 1)
+                if pulled and i in device.broken_taps:
+                    mv = 200.0  # pull-down current discharges the open input
+                codes.append(self._cell_code(device, i, mv))
+            device.s = codes
+
+    def _convert_aux(self):
+        for device in self.devices:
+            device.aux = [max(-0x8000, min(0x7FFF, round((mv - 1500) / 0.15))) for mv in device.gpio_mv]
+            device.vstr = max(-0x8000, min(0x7FFF, round((sum(device.cells_mv) / 1000 - 37.5) / 0.00375)))
+
+    def _check_ov_uv(self, device):
+        cfgb = device.regs.get(0x026, 0)
+        uv = self._threshold_mv(cfgb & 0xFFF)
+        ov = self._threshold_mv((cfgb >> 12) & 0xFFF)
+        for i in range(CELLS):
+            mv = 1500 + device.c[i] * 0.15
+            if mv < uv:
+                device.flags |= 1 << (2 * i)
+            if mv > ov:
+                device.flags |= 1 << (2 * i + 1)
+
+    @staticmethod
+    def _threshold_mv(code):
+        if code & 0x800:
+            code -= 0x1000
+        return 1500 + code * 2.4
+
+    # -- result registers ---------------------------------------------------
+
+    def _read_data(self, device, code, length):
+        c, s, avg, filt, aux, vstr, flags, count = device.results()
+        if code in self.CELL_GROUPS:
+            result, first, cells = self.CELL_GROUPS[code]
+            codes = [round(x) for x in (c, s, avg, filt)[result][first:first + cells]]
+            data = struct.pack("<%dh" % len(codes), *codes)
+        elif code in self.AUX_GROUPS:
+            first = self.AUX_GROUPS[code]
+            data = struct.pack("<3h", *aux[first:first + 3])
+        elif code == 0x01F:  # RDAUXD, GPIO10 and the module voltage in bits 32..47
+            data = struct.pack("<hhh", aux[9], 0, vstr)
+        elif code == 0x02C:  # RDSID
+            data = (0x183000000000 + device.index).to_bytes(6, "little")
+        elif code == 0x030:  # RDSTATA, second reference and die temperature (25 degC)
+            data = struct.pack("<hhh", round(1500 / 0.15) - 10000, round((25 + 73) / 0.02), 0)
+        elif code == 0x031:  # RDSTATB, supplies
+            data = struct.pack("<hhh", round((3300 - 1500) / 0.15), round((5000 - 1500) / 0.15), 0)
+        elif code == 0x032:  # RDSTATC, conversion counter split as the driver decodes it
+            data = struct.pack("<HHH", 0, ((count >> 6) & 0xFF) | ((count & 0x3F) << 10), 0)
+        elif code == 0x033:  # RDSTATD
+            data = struct.pack("<IH", flags, 0)
+        elif code in device.regs:
+            data = device.regs[code].to_bytes(6, "little")
+        else:
+            data = bytes(6)
+        if len(data) < length:
+            data += b"\xff" * (length - len(data))
+        return data[0:length]
+
+
+def make_hal(emu):
+    """Return an ADES1830_HAL.HAL driving the emulator."""
+    install_fake_machine()
+    if str(ADES_DIR) not in sys.path:
+        sys.path.insert(0, str(ADES_DIR))
+    from ADES1830_HAL import HAL
+    return HAL(spi=emu, nr_of_devices=emu.nr_of_devices)
+
+
+def main():
+    from bench_ades1830_pec import ref_crc10, ref_crc15
+
+    rng = random.Random(6830)
+    for _ in range(500):
+        data = bytes(rng.getrandbits(8) for _ in range(rng.choice((2, 6, 32))))
+        cc = rng.getrandbits(6)
+        if pec15(data) != ref_crc15(data, len(data)) or pec10(data, cc) != ref_crc10(data, len(data), cc << 2):
+            raise AssertionError("emulator PEC differs from the bit-serial reference")
+
+    clock = VirtualClock().install()
+    emu = ADES1830Emulator(nr_of_devices=2, clock=clock)
+    emu.devices[1].cells_mv = [3300.0 + 10 * i for i in range(CELLS)]
+    hal = make_hal(emu)
+    from ADES1830 import ADES1830
+
+    ades = ADES1830(hal=hal)
+    ncell = ades.init(4.2, 2.5)
+    if ncell != 2 * CELLS:
+        raise AssertionError(f"init detected {ncell} cells")
+    if hal.cmd_counter[0] == 0:
+        raise AssertionError("command counter did not advance")
+    ades.start_cell_volt_conv(continuous=True)
+    ades.start_aux_adc_conv()
+    ades.wait_conversion_blocking("aux")
+    clock.advance(20000)
+    cycle = ades.read_cycle(mode="average")
+    expected = [3.7] * CELLS + [round(3.3 + 0.01 * i, 3) for i in range(CELLS)]
+    if cycle["vcell"] != expected:
+        raise AssertionError(f"cell voltages {cycle['vcell']}")
+    if abs(cycle["vstr"] - (59.2 + sum(expected[CELLS:]))) > 0.01:
+        raise AssertionError(f"string voltage {cycle['vstr']}")
+    if any(cycle["ov"]) or any(cycle["uv"]):
+        raise AssertionError("unexpected OV/UV flags")
+    count, start = cycle["conv_cnt"], clock.us
+    clock.advance(5000)
+    count = ades.read_cycle()["conv_cnt"] - count
+    if emu.C_CONV_US != ades.C_CONV_US or abs(count - (clock.us - start) // ades.C_CONV_US) > 1:
+        raise AssertionError("conversion counter does not follow the conversion timing")
+    for _ in range(3):  # each wait needs a conversion completing after the call
+        clock.advance(5300)
+        count = ades.get_conversion_counter()
+        waited = ades.wait_conversion_blocking("counter")
+        if ades.get_conversion_counter() == count or waited > emu.C_CONV_US + 500:
+            raise AssertionError(f"counter wait returned after {waited} us without a new conversion")
+    pwm = [i // 2 for i in range(2 * CELLS)]    # devices get different duties
+    ades.write_pwm(pwm)
+    ades.verify_pwm()
+    if ades.get_pwm() != pwm or emu.devices[1].pwm(3) != 9:
+        raise AssertionError("balancing duty not written per device")
+    ades.write_pwm([15 - i % 16 for i in range(2 * CELLS)])
+    ades.verify_pwm()
+    frame = ades.acquire_snapshot()
+    if frame.cells[:CELLS] != frame.s_cells[:CELLS] and emu.c_redundant:
+        raise AssertionError("snapshot mismatch")
+    from ADES1830_RING import SampleRing
+    ades.set_cell_map([ch for ch in range(2 * CELLS) if ch not in (5, 20)])
+    ring = SampleRing(capacity=4, nr_of_cells=len(ades.cell_map))
+    clock.advance(2000)
+    if not ring.poll(ades) or list(ring.cells()) != list(ades.read_cells()):
+        raise AssertionError("sample ring does not hold the mapped cells in logical order")
+    ades.set_cell_map()
+    if hal.stats()["cc_mismatches"]:
+        raise AssertionError("HAL and emulator disagree on the command counter")
+    emu.inject_pec_error(device=1)
+    ades.get_cell_codes()
+    if hal.stats(0x00C)["retries"] != 1:
+        raise AssertionError("single PEC error was not retried")
+    emu.inject_pec_error(device=1, count=hal.retries + 1)
+    try:
+        ades.get_cell_codes()
+    except ValueError as err:
+        if "device 1" not in str(err):
+            raise
+    else:
+        raise AssertionError("persistent PEC error was not raised")
+    reads = [0]
+
+    def fail_second_frame(buf):
+        reads[0] += 1
+        if reads[0] == hal.retries + 2:  # first try of the second frame
+            emu.inject_pec_error(device=0, count=hal.retries + 1)
+        ADES1830Emulator.readinto(emu, buf)
+
+    emu.inject_pec_error(device=1, count=hal.retries + 1)  # every try of the first frame
+    emu.readinto = fail_second_frame
+    try:
+        ades.read_cycle()
+    except ValueError as err:
+        if "device 1" not in str(err):
+            raise AssertionError(f"batch read raised {err}, not its first PEC error")
+    else:
+        raise AssertionError("persistent PEC error in a batch was not raised")
+    finally:
+        del emu.readinto
+    pec = pec15(bytes([0x00, 0x28]))
+    emu.write(bytes([0x00, 0x28, pec >> 8, pec & 0xFF]))  # MUTE the HAL did not send
+    ades.get_conversion_counter()
+    if hal.stats()["cc_mismatches"] != emu.nr_of_devices:  # counted per device
+        raise AssertionError("extra command was not detected by the command counter")
+    if hal.stats(0x032)["cc_mismatches"] != emu.nr_of_devices or hal.stats(0x00C)["cc_mismatches"]:
+        raise AssertionError("command counter mismatch not booked on the RDSTATC read")
+    ades.unmute_discharge()
+    # register snapshot: one batch, serialized and decoded again
+    before = emu.transactions
+    blob = ades.health_snapshot()
+    if emu.transactions - before != len(ades.register_map.registers):
+        raise AssertionError("register snapshot did not read each register once")
+    decoded = ades.register_map.decode_snapshot(blob)
+    if decoded[0] != ades.register_map.snapshot_dict(0) or decoded[1] != ades.register_map.snapshot_dict(1):
+        raise AssertionError("register snapshot does not survive serialization")
+    if decoded[1]["PWMA.pwm"] != ades._pwm_words[0][1] or decoded[1]["RDSTATC.conversion_counter"] == 0:
+        raise AssertionError("register snapshot decoded wrong field values")
+    for device, blob in enumerate(ades.health_snapshot(per_device=True)):
+        # main3 sends each device as a JSON message in its own ESP-NOW frame (max. 250 bytes)
+        msg = json.dumps({"type": "hlt", "dev": device, "snap": binascii.b2a_base64(blob, newline=False).decode()})
+        if len(msg) > 250 or ades.register_map.decode_snapshot(blob) != [ades.register_map.snapshot_dict(device)]:
+            raise AssertionError(f"health message of device {device} ({len(msg)} bytes) does not fit or decode")
+    # IIR step response against the latency the driver reports
+    ades.set_iir_filter(4)
+    ades.start_cell_volt_conv(continuous=True, reset_filter=True)
+    clock.advance(2000)
+    start_us = clock.us
+    emu.devices[0].cells_mv[0] = 3800.0
+    while ades.get_cell_codes(mode="filtered")[0] < round((3790 - 1500) / 0.15):
+        clock.advance(100)
+    t90_ms = (clock.us - start_us) / 1000
+    expected_ms = ades.iir_latency()["t90_ms"]
+    if abs(t90_ms - expected_ms) > 0.1 * expected_ms:
+        raise AssertionError(f"IIR t90 {t90_ms} ms, driver reports {expected_ms} ms")
+    # balancing with the filter on: windows read averages, the filter stays for idle reads
+    from ADES1830_BAL import BalanceCoordinator
+    emu.bal_drop_mv = 50
+    ades.set_iir_corner(5)
+    coord = BalanceCoordinator(ades)
+    coord.set_pwm([15] * ades.nr_of_cells)
+    clock.advance(500000)
+    if ades.read_cycle(mode="filtered")["vcell"][1] > 3.66:
+        raise AssertionError("balancing drop not seen by the filter")
+    if coord.read_mode("filtered") != "average":
+        raise AssertionError("balancing window does not read averages")
+    cycle = asyncio.run(coord.window(lambda: ades.read_cycle(mode=coord.read_mode("filtered"))))
+    if abs(cycle["vcell"][1] - 3.7) > 0.001:
+        raise AssertionError(f"averaged read in balancing window {cycle['vcell'][1]} V, expected 3.7 V")
+    if coord.max_window_us > coord.settle_us + (coord.conversions + 2) * emu.C_CONV_US:
+        raise AssertionError(f"balancing window {coord.max_window_us} us longer than its conversions")
+    ades.start_cell_volt_conv(continuous=False)
+    try:
+        asyncio.run(coord.window(lambda: ades.read_cycle()))
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("balancing window without continuous conversions was not refused")
+    ades.start_cell_volt_conv(continuous=True)
+    coord.set_pwm([0] * ades.nr_of_cells)
+    emu.bal_drop_mv = 0
+    print(f"emulator check passed: {emu.transactions} transactions, {emu.bytes} bytes, "
+          f"{clock.us / 1000:.1f} ms simulated")
+
+
+if __name__ == "__main__":
+    main()
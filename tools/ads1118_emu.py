@@ -0,0 +1,256 @@
+"""
+Host-side emulator of ADS1118 converters behind an SN74HC154 chip select demux.
+
+ADS1118Bus has the write_readinto() interface of machine.SoftSPI and a
+select()/deselect() pair like lib/SN74HC154.py, so ADS1118 instances run
+unmodified on Linux. Each ADS1118Device holds its config register, converts
+the voltage wired to the selected mux input with the timing of its data rate
+(scaled by a per device oscillator error) and returns, like the real part,
+the latest completed result in the same transfer that writes the next
+config. Reads that return a result the driver already saw are counted as
+stale, so a scan that does not wait long enough shows up immediately.
+
+The clock is the VirtualClock of ades1830_emu, SPI transfers advance it.
+
+    python tools/ads1118_emu.py [--adcs 12] [--dr 4] [--sweeps 50]
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+from ades1830_emu import VirtualClock
+from bench_ades1830_hal import install_fake_machine
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+DR_SPS = (8, 16, 32, 64, 128, 250, 475, 860)
+FSR = (6.144, 4.096, 2.048, 1.024, 0.512, 0.256, 0.256, 0.256)
+# channel_mux of the max slave: 10 ADCs with 3 cells, 2 with 2 inputs
+SLAVE_MUX = {0: 0b000, 1: 0b010, 2: 0b011}
+SLAVE_MUX_2 = {0: 0b000, 1: 0b011}
+
+
+def install_host_modules():
+    """Provide the MicroPython modules lib/ADS1118.py and common/logger.py import."""
+    install_fake_machine()
+    machine = sys.modules["machine"]
+    if not hasattr(machine, "RTC"):
+        class RTC:
+            def datetime(self):
+                t = time.localtime()
+                return (t[0], t[1], t[2], t[6], t[3], t[4], t[5], 0)
+
+        machine.RTC = RTC
+        machine.reset = lambda: None
+    micropython = types.ModuleType("micropython")
+    micropython.const = lambda x: x
+    sys.modules.setdefault("micropython", micropython)
+    sys.modules.setdefault("ujson", json)
+    sys.modules.setdefault("usocket", socket)
+    if str(SRC_DIR) not in sys.path:
+        sys.path.insert(0, str(SRC_DIR))
+
+
+class ADS1118Device:
+    """One converter: config register, conversion timing and result latch."""
+
+    def __init__(self, clock, osc_error=0.0, noise_uv=0.0, rng=None, spike_rate=0.0, spike_mv=0.0):
+        self.clock = clock
+        self.osc = 1.0 + osc_error
+        self.noise_uv = noise_uv
+        self.spike_rate = spike_rate   # probability of a conversion hit by a spike
+        self.spike_mv = spike_mv
+        self.rng = rng or random.Random(1118)
+        self.inputs = {}            # mux code -> volts
+        self.temp_c = 25.0
+        self.config = 0x058B        # reset value: single-shot, 128 SPS, PGA 2.048 V
+        self.data = 0
+        self.fresh = False          # a result completed since the last read
+        self.conv_end = None        # end of the running conversion in us
+        self.conv_config = 0
+        self.conversions = 0
+        self.stale_reads = 0
+
+    def conversion_us(self, config=None):
+        config = self.config if config is None else config
+        return 1e6 / DR_SPS[(config >> 5) & 7] * self.osc
+
+    def _code(self, config):
+        if config & 0x10:  # temperature sensor, 14 bit left justified
+            return (round(self.temp_c / 0.03125) << 2) & 0xFFFF
+        volts = self.inputs.get((config >> 12) & 7, 0.0)
+        if self.noise_uv:
+            volts += self.rng.gauss(0.0, self.noise_uv * 1e-6)
+        if self.spike_rate and self.rng.random() < self.spike_rate:
+            volts += self.spike_mv * 1e-3
+        code = round(volts * 32768 / FSR[(config >> 9) & 7])
+        return max(-32768, min(32767, code)) & 0xFFFF
+
+    def _update(self):
+        """Latch conversions that completed up to now."""
+        now = self.clock.now_us()
+        while self.conv_end is not None and now >= self.conv_end:
+            self.data = self._code(self.conv_config)
+            self.fresh = True
+            self.conversions += 1
+            if self.conv_config & 0x100:  # single-shot: power down
+                self.conv_end = None
+            else:
+                self.conv_config = self.config
+                self.conv_end += self.conversion_us()
+
+    def transfer(self, config):
+        """Return the latest result and take a new config word."""
+        self._update()
+        if not self.fresh:
+            self.stale_reads += 1
+        self.fresh = False
+        data = self.data
+        if (config >> 1) & 3 == 0b01:  # NOP=01: config is valid
+            self.config = config
+            if config & 0x100:
+                if config & 0x8000 and self.conv_end is None:
+                    self.conv_config = config
+                    self.conv_end = self.clock.now_us() + self.conversion_us(config)
+            elif self.conv_end is None:  # continuous mode starts right away
+                self.conv_config = config
+                self.conv_end = self.clock.now_us() + self.conversion_us(config)
+        return data
+
+    def drdy(self):
+        """Level of DOUT/DRDY while selected: low once a new result is ready."""
+        self._update()
+        return 0 if self.fresh else 1
+
+
+class _DrdyPin:
+    """The MISO line as seen by a machine.Pin input, a poll costs poll_us."""
+
+    def __init__(self, bus, poll_us=20):
+        self.bus = bus
+        self.poll_us = poll_us
+
+    def value(self):
+        self.bus.clock.advance(self.poll_us)
+        device = self.bus.devices.get(self.bus.selected)
+        return 1 if device is None else device.drdy()
+
+
+class ADS1118Bus:
+    """SPI bus plus SN74HC154 demux with up to 16 ADS1118Device behind it.
+
+    drdy is a pin object reading DOUT/DRDY of the selected device.
+    """
+
+    def __init__(self, devices, clock, transfer_us=40):
+        self.devices = devices
+        self.clock = clock
+        self.transfer_us = transfer_us
+        self.selected = None
+        self.transactions = 0
+        self.drdy = _DrdyPin(self)
+
+    def select(self, output):
+        self.selected = output
+
+    def deselect(self):
+        self.selected = None
+
+    def write_readinto(self, tx, rx):
+        device = self.devices.get(self.selected)
+        self.clock.advance(self.transfer_us)
+        self.transactions += 1
+        if device is None:
+            rx[0] = rx[1] = 0xFF
+            return
+        data = device.transfer((tx[0] << 8) | tx[1])
+        rx[0] = data >> 8
+        rx[1] = data & 0xFF
+
+
+def empty_cal_file():
+    """Return the path of a fresh, empty calibration file."""
+    path = str(Path(tempfile.mkdtemp()) / "ads1118_cal.json")
+    with open(path, "w") as f:
+        f.write("{}")
+    return path
+
+
+def make_slave(nr_of_adcs=12, dr=4, osc_spread=0.05, noise_uv=0.0, seed=1118, spike_rate=0.0, spike_mv=0.0):
+    """Build the max slave ADC front end: bus, devices and ADS1118 instances.
+
+    Demux outputs follow src/slave/slave.py, the last ADC of each string
+    measures two inputs. Every cell gets a distinct voltage so index
+    mix-ups are visible. Returns (clock, bus, adcs, expected voltages).
+    """
+    install_host_modules()
+    clock = VirtualClock().install()
+    from lib.ADS1118 import ADS1118
+
+    rng = random.Random(seed)
+    cal_file = empty_cal_file()
+    outputs = [0x1, 0x2, 0x3, 0x4, 0x5, 0x6, 0xF, 0xE, 0xD, 0xC, 0xB, 0x0][:nr_of_adcs]
+    devices = {}
+    bus = ADS1118Bus(devices, clock)
+    adcs = []
+    expected = []
+    for n, output in enumerate(outputs):
+        mux = SLAVE_MUX_2 if n % 6 == 5 else SLAVE_MUX
+        device = ADS1118Device(clock, osc_error=rng.uniform(-osc_spread, osc_spread),
+                               noise_uv=noise_uv, rng=rng, spike_rate=spike_rate, spike_mv=spike_mv)
+        for ch, code in mux.items():
+            volts = 1.0 + 0.01 * len(expected)
+            device.inputs[code] = volts
+            expected.append(volts)
+        devices[output] = device
+        adcs.append(ADS1118(spi=bus, demux=bus, demux_output=output, pga=2, dr=dr,
+                            channel_mux=mux, gain=[1.0] * len(mux), cal_file=cal_file))
+    return clock, bus, adcs, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--adcs", type=int, default=12)
+    parser.add_argument("--dr", type=int, default=4)
+    parser.add_argument("--sweeps", type=int, default=50)
+    args = parser.parse_args()
+
+    clock, bus, adcs, expected = make_slave(args.adcs, args.dr)
+    from lib.ADS1118 import ADS1118Scanner
+
+    scanner = ADS1118Scanner(adcs)
+
+    async def run():
+        for _ in range(args.sweeps):
+            await scanner.sweep()
+
+    scanner.reset_stats()
+    start = clock.us
+    asyncio.run(run())
+    elapsed = clock.us - start
+    lsb = FSR[2] / 32768
+    for i, volts in enumerate(expected):
+        if abs(scanner.voltages[i] - volts) > 2 * lsb:
+            raise AssertionError(f"channel {i}: {scanner.voltages[i]:.4f} V, expected {volts:.4f} V")
+    stale = sum(device.stale_reads for device in bus.devices.values())
+    # the very first round of the pipeline reads whatever the devices hold
+    if stale > len(adcs):
+        raise AssertionError(f"{stale} stale reads, the scan does not wait for the conversions")
+    stats = scanner.stats()
+    sps = DR_SPS[args.dr]
+    print(f"{len(adcs)} ADCs, {scanner.nr_of_ch} channels at {sps} SPS, {args.sweeps} sweeps")
+    print(f"sweep {stats['sweep_us'] / 1000:.2f} ms, theoretical {stats['min_sweep_us'] / 1000:.2f} ms, "
+          f"average {elapsed / args.sweeps / 1000:.2f} ms, {bus.transactions / args.sweeps:.1f} transfers/sweep")
+    print("samples/s per ADC: " + " ".join(f"{x:.0f}" for x in stats["sps"]))
+    print("scan check passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Allocation benchmark for the ADES1830 HAL transaction engine.
+
+Runs the HAL and the ADES1830 cycle decode against a fake SPI object on the
+host (CPython or the MicroPython unix port) and reports how much heap a full
+cell + aux + status read cycle allocates, compared to the previous
+allocate-per-frame read path. Exits with an error if a steady-state cycle of
+HAL.read_many(), ADES1830.get_cell_codes()/get_cell_millivolts() or
+ADES1830.read_cycle_raw() or SampleRing.poll() allocates anything.
+
+On MicroPython the count is gc.mem_alloc(), in bytes. CPython boxes ints and
+recycles tuples and lists through free lists, so its heap counters say
+nothing about the target; there the cycle runs under a tracer that counts
+the operations which allocate on MicroPython: container, slice and string
+building bytecodes and calls into C functions outside ALLOWED_C_CALLS.
+
+    python tools/bench_ades1830_hal.py [--cycles 1000]
+"""
+import argparse
+import dis
+import gc
+import struct
+import sys
+import time
+import types
+from pathlib import Path
+
+ADES_DIR = Path(__file__).resolve().parent.parent / "src" / "lib" / "ades1830"
+
+# Register groups read per monitoring cycle
+RDACALL = 0x04C  # 16 averaged cells, 32 bytes
+RDAUXD = 0x01F   # string voltage
+RDSTATC = 0x032  # conversion counter
+RDSTATD = 0x033  # OV/UV flags
+CYCLE = ((RDACALL, 32), (RDAUXD, 6), (RDSTATC, 6), (RDSTATD, 6))
+
+# Bytecodes that build a new object (BUILD_SLICE only when loading a slice,
+# MicroPython keeps the slice of a store off the heap)
+ALLOCATING_OPS = frozenset((
+    "BUILD_TUPLE", "BUILD_LIST", "BUILD_SET", "BUILD_MAP", "BUILD_CONST_KEY_MAP",
+    "BUILD_STRING", "FORMAT_VALUE", "LIST_APPEND", "LIST_EXTEND", "LIST_TO_TUPLE",
+    "SET_ADD", "MAP_ADD", "DICT_UPDATE", "DICT_MERGE", "MAKE_FUNCTION", "RETURN_GENERATOR",
+))
+# C functions that return small ints, None or existing objects
+ALLOWED_C_CALLS = frozenset(("len", "range", "get", "ticks_us", "ticks_diff", "perf_counter", "perf_counter_ns"))
+
+
+def install_fake_machine():
+    """Provide a minimal 'machine' module so the HAL can be imported on the host."""
+    if "machine" in sys.modules:
+        return
+    machine = types.ModuleType("machine")
+
+    class Pin:
+        OUT = 1
+        IN = 0
+
+        def __init__(self, pin, mode=None, value=None):
+            self.pin = pin
+            self._value = value or 0
+
+        def value(self, v=None):
+            if v is None:
+                return self._value
+            self._value = v
+
+    class SoftSPI:
+        def __init__(self, *args, **kwargs):
+            raise OSError("SoftSPI is not available on the host, pass a fake spi")
+
+    machine.Pin = Pin
+    machine.SoftSPI = SoftSPI
+    sys.modules["machine"] = machine
+    if not hasattr(time, "sleep_us"):
+        time.sleep_us = lambda us: None
+        time.sleep_ms = lambda ms: None
+    if not hasattr(time, "ticks_us"):
+        time.ticks_us = lambda: time.perf_counter_ns() // 1000 & 0x3FFFFFFF
+
+
+class FakeSPI:
+    """Answers every read with a fixed pattern and a valid PEC10, allocation free."""
+
+    def __init__(self, crc10):
+        self.crc10 = crc10
+        self.writes = 0
+        self.reads = 0
+
+    def write(self, buf):
+        self.writes += 1
+
+    def readinto(self, buf):
+        self.reads += 1
+        length = len(buf) - 2
+        if length < 1:  # ADC poll, report conversion done
+            for i in range(len(buf)):
+                buf[i] = 0xFF
+            return
+        for i in range(length):
+            buf[i] = (i * 37 + 11) & 0xFF
+        buf[length] = 0
+        pec = self.crc10(buf, length, True)
+        buf[length] = (pec >> 8) & 0x03
+        buf[length + 1] = pec & 0xFF
+
+
+def legacy_read(hal_mod, hal, address, length=6):
+    """The read path before the transaction engine, kept for comparison."""
+    crc15, crc10 = hal_mod.crc15, hal_mod.crc10
+    hal.cs.value(0)
+    cmd0 = (address >> 8) & 0x07
+    cmd1 = address & 0xFF
+    pec = crc15(bytes([cmd0, cmd1]), 2)
+    hal.spi.write(bytes([cmd0, cmd1, (pec >> 8) & 0xFF, pec & 0xFF]))
+    buf = bytearray(length + 2)
+    hal.spi.readinto(buf)
+    hal.cs.value(1)
+    data = buf[0:length]
+    data_crc = buf[0:length] + bytes([buf[length] & 0xFC])
+    received_pec = ((buf[length] & 0x03) << 8) | buf[length + 1]
+    if received_pec != crc10(data_crc, length=length, receive=True):
+        raise ValueError("PEC mismatch")
+    value = int.from_bytes(data, "little")
+    return value & 0xFFFFFFFFFFFF if length <= 6 else data
+
+
+def cycle_view(hal):
+    for address, length in CYCLE:
+        hal.read_view(address, length)
+
+
+def cycle_legacy(hal_mod, hal):
+    for address, length in CYCLE:
+        legacy_read(hal_mod, hal, address, length)
+
+
+def cycle_many(hal):
+    hal.read_many(CYCLE)
+
+
+def _instructions(code, cache={}):
+    ops = cache.get(code)
+    if ops is None:
+        instructions = [i for i in dis.get_instructions(code) if i.opname != "CACHE"]
+        ops = {}
+        for i, ins in enumerate(instructions):
+            name = ins.opname
+            if name == "BUILD_SLICE" and instructions[i + 1].opname != "STORE_SUBSCR":
+                name = "BUILD_SLICE (load)"
+            ops[ins.offset] = name
+        cache[code] = ops
+    return ops
+
+
+def count_allocating_ops(fn):
+    """Run fn once (CPython) and return the allocating operations it executed, see ALLOCATING_OPS."""
+    found = []
+    own_code = count_allocating_ops.__code__
+
+    def trace(frame, event, arg):
+        if event == "call":
+            frame.f_trace_opcodes = True
+            frame.f_trace_lines = False
+        elif event == "opcode":
+            name = _instructions(frame.f_code).get(frame.f_lasti)
+            if name in ALLOCATING_OPS or name == "BUILD_SLICE (load)":
+                found.append(f"{frame.f_code.co_name}:{frame.f_lineno} {name}")
+        return trace
+
+    def profile(frame, event, arg):
+        if event == "c_call" and arg.__name__ not in ALLOWED_C_CALLS and frame.f_code is not own_code:
+            found.append(f"{frame.f_code.co_name}:{frame.f_lineno} {arg.__name__}()")
+
+    sys.settrace(trace)
+    sys.setprofile(profile)
+    try:
+        fn()
+    finally:
+        sys.setprofile(None)
+        sys.settrace(None)
+    return found
+
+
+def measure(fn, cycles):
+    """Return (allocated per steady-state cycle, microseconds per cycle).
+
+    Allocated is a byte count on MicroPython, the list of allocating
+    operations of one cycle on CPython (see count_allocating_ops()).
+    """
+    fn()  # warm up lazily created frames
+    gc.collect()
+    if sys.implementation.name == "micropython":
+        gc.disable()
+        before = gc.mem_alloc()
+        t0 = time.ticks_us()
+        for _ in range(cycles):
+            fn()
+        elapsed = time.ticks_diff(time.ticks_us(), t0)
+        allocated = gc.mem_alloc() - before
+        gc.enable()
+        return allocated / cycles, elapsed / cycles
+    fn()
+    allocated = count_allocating_ops(fn)
+    t0 = time.perf_counter()
+    for _ in range(cycles):
+        fn()
+    elapsed = (time.perf_counter() - t0) * 1e6
+    return allocated, elapsed / cycles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=1000)
+    args = parser.parse_args()
+
+    install_fake_machine()
+    sys.path.insert(0, str(ADES_DIR))
+    import ADES1830_HAL as hal_mod
+
+    hal = hal_mod.HAL(spi=FakeSPI(hal_mod.crc10))
+    cells = struct.unpack("<16H", hal.read_view(RDACALL, 32))
+    print(f"Sanity: first cell code 0x{cells[0]:04x}, {len(CYCLE)} frames per cycle")
+
+    from ADES1830 import ADES1830
+    ades = ADES1830(hal=hal)
+    codes = ades.new_cell_array()
+    from ADES1830_RING import SampleRing
+    ring = SampleRing(capacity=8, nr_of_cells=len(ades.cell_map))
+
+    def poll_sample():
+        ring.last_count = -1  # the fake counter never advances
+        ring.poll(ades, mode="average")
+    conv_cnt = ades.read_cycle_raw(mode="average", gpio=True)
+    print(f"Sanity: read_cycle_raw cell 0 code {ades.cycle_codes[0]}, conv_cnt {conv_cnt}")
+
+    paths = (
+        ("legacy", lambda: cycle_legacy(hal_mod, hal)),
+        ("read_view", lambda: cycle_view(hal)),
+        ("read_many", lambda: cycle_many(hal)),
+        ("get_cell_codes", lambda: ades.get_cell_codes(codes, mode="average")),
+        ("get_cell_mv", lambda: ades.get_cell_millivolts(codes, mode="average")),
+        ("read_cycle_raw", lambda: ades.read_cycle_raw(mode="average")),
+        ("+ gpio", lambda: ades.read_cycle_raw(mode="average", gpio=True)),
+        ("SampleRing.poll", poll_sample),
+    )
+    micropython = sys.implementation.name == "micropython"
+    unit = "bytes/cycle" if micropython else "alloc ops/cycle"
+    print(f"{'path':<16}{unit:>16}{'us/cycle':>12}")
+    failed = []
+    for name, fn in paths:
+        allocated, us = measure(fn, args.cycles)
+        count = allocated if micropython else len(allocated)
+        print(f"{name:<16}{count:>16.0f}{us:>12.1f}")
+        if name != "legacy" and count > 0:
+            failed.append((name, allocated))
+    for name, allocated in failed:
+        print(f"{name} allocates per cycle: {allocated}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Accuracy and speed of the ADES1830 NTC lookup table against direct Steinhart-Hart.
+
+Sweeps every raw GPIO code inside the table range, compares NtcTable.lookup()
+with the exact temperature from math.log and times both paths. On CPython
+the C math.log path is the faster one; on the ESP32 every float operation
+of the direct formula allocates on the MicroPython heap while the lookup
+stays on small ints, which is what the table is for.
+
+    python tools/bench_ades1830_ntc.py [--step 1] [--iterations 20000]
+"""
+import argparse
+import math
+import sys
+import time
+
+from bench_ades1830_hal import ADES_DIR
+
+A, B, C = 1.009249522e-3, 2.378405444e-4, 2.019202697e-7
+R_SERIES = 10000
+VREF_MV = 3000
+
+
+def exact_temp(code):
+    mv = 1500 + code * 0.15
+    r = R_SERIES * mv / (VREF_MV - mv)
+    ln_r = math.log(r)
+    return 1 / (A + B * ln_r + C * ln_r ** 3) - 273.15
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--step", type=int, default=1, help="table step in degC")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ADES_DIR))
+    from ADES1830_NTC import NtcTable
+
+    table = NtcTable(A, B, C, R_SERIES, VREF_MV, step=args.step)
+    worst = 0.0
+    worst_code = 0
+    for code in range(table.codes[table.size - 1], table.codes[0] + 1):
+        err = abs(table.lookup(code) / 10 - exact_temp(code))
+        if err > worst:
+            worst, worst_code = err, code
+    print(f"table: {table.size} entries, {table.size * 2} bytes, step {args.step} degC")
+    print(f"max error {worst:.3f} degC at code {worst_code} ({exact_temp(worst_code):.1f} degC)")
+
+    codes = [table.codes[i] - 3 for i in range(0, table.size, 7)]
+    n = args.iterations
+    for name, fn in (("NtcTable.lookup", table.lookup), ("Steinhart-Hart", exact_temp)):
+        t0 = time.perf_counter()
+        for i in range(n):
+            fn(codes[i % len(codes)])
+        print(f"{name:<16}{(time.perf_counter() - t0) * 1e6 / n:>8.2f} us/sample")
+
+
+if __name__ == "__main__":
+    main()
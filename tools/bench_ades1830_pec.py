@@ -0,0 +1,104 @@
+"""
+Verification and microbenchmark for the ADES1830 PEC (CRC) path.
+
+Checks crc15(), crc10() and the cached command frames of ADES1830_HAL against
+a bit-serial reference implementation of the PEC15/PEC10 polynomials, then
+times them on the host.
+
+    python tools/bench_ades1830_pec.py [--frames 2000] [--iterations 20000]
+"""
+import argparse
+import random
+import sys
+import time
+
+from bench_ades1830_hal import ADES_DIR, install_fake_machine
+
+
+def ref_crc15(data, length):
+    """Bit-serial PEC15, polynomial 0x4599, seed 0x10."""
+    crc = 0x10
+    for i in range(length):
+        byte = data[i]
+        for bit in range(7, -1, -1):
+            feedback = ((crc >> 14) & 1) ^ ((byte >> bit) & 1)
+            crc = (crc << 1) & 0x7FFF
+            if feedback:
+                crc ^= 0x4599
+    return crc << 1
+
+
+def ref_crc10(data, length, command_counter=0):
+    """Bit-serial PEC10, polynomial 0x08F, seed 0x10, followed by the 6 CC bits."""
+    crc = 0x10
+    for i in range(length + 1):
+        if i < length:
+            byte, nbits = data[i], 8
+        else:
+            byte, nbits = command_counter >> 2, 6
+        for bit in range(nbits - 1, -1, -1):
+            feedback = ((crc >> 9) & 1) ^ ((byte >> bit) & 1)
+            crc = (crc << 1) & 0x3FF
+            if feedback:
+                crc ^= 0x08F
+    return crc
+
+
+def verify(hal_mod, frames):
+    rng = random.Random(1830)
+    for code in range(0x800):
+        cmd = bytes([(code >> 8) & 0x07, code & 0xFF])
+        pec = ref_crc15(cmd, 2)
+        if hal_mod.crc15(cmd, 2) != pec:
+            raise AssertionError(f"crc15 mismatch for command 0x{code:03x}")
+        if hal_mod.cmd_frame(code) != cmd + bytes([pec >> 8, pec & 0xFF]):
+            raise AssertionError(f"cmd_frame mismatch for command 0x{code:03x}")
+    for _ in range(frames):
+        length = rng.choice((6, 32))
+        buf = bytearray(rng.getrandbits(8) for _ in range(length + 2))
+        if hal_mod.crc10(buf, length) != ref_crc10(buf, length):
+            raise AssertionError(f"crc10 mismatch for {buf.hex()}")
+        if hal_mod.crc10(buf, length, receive=True) != ref_crc10(buf, length, buf[length] & 0xFC):
+            raise AssertionError(f"crc10 receive mismatch for {buf.hex()}")
+    print(f"PEC verification passed: 2048 commands, {frames} random frames")
+
+
+def timeit(fn, iterations):
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - t0) * 1e6 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    install_fake_machine()
+    sys.path.insert(0, str(ADES_DIR))
+    import ADES1830_HAL as hal_mod
+
+    verify(hal_mod, args.frames)
+
+    cells = bytearray(range(34))
+    status = bytearray(range(8))
+    cmd = bytes([0x02, 0x60])
+    n = args.iterations
+    rows = (
+        ("crc15 cmd (reference)", lambda: ref_crc15(cmd, 2)),
+        ("crc15 cmd", lambda: hal_mod.crc15(cmd, 2)),
+        ("cmd_frame (cached)", lambda: hal_mod.cmd_frame(0x260)),
+        ("crc10 6B rx (reference)", lambda: ref_crc10(status, 6, status[6] & 0xFC)),
+        ("crc10 6B rx", lambda: hal_mod.crc10(status, 6, True)),
+        ("crc10 32B rx (reference)", lambda: ref_crc10(cells, 32, cells[32] & 0xFC)),
+        ("crc10 32B rx", lambda: hal_mod.crc10(cells, 32, True)),
+    )
+    print(f"{'function':<26}{'us/call':>10}")
+    for name, fn in rows:
+        print(f"{name:<26}{timeit(fn, n):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Throughput and allocation benchmark of the whole ADES1830 driver stack.
+
+Runs ADES1830 -> HAL -> ADES1830Emulator on the host with a virtual clock
+and reports, per driver operation, host time, SPI transactions, simulated
+bus time and peak heap. Host time measures the Python overhead of the
+stack, the simulated bus time what a 1 MHz SPI adds on the target. The peak
+heap includes the response frames the emulator builds, compare rows and
+runs with each other rather than reading them as absolute driver numbers;
+tools/bench_ades1830_hal.py measures the HAL alone with an allocation free
+fake SPI.
+
+    python tools/bench_ades1830_stack.py [--devices 1] [--ops 500]
+"""
+import argparse
+import gc
+import sys
+import time
+
+from ades1830_emu import ADES1830Emulator, VirtualClock, make_hal
+
+
+def measure(fn, ops, emu, clock):
+    """Return (us per op, transactions per op, simulated bus us per op, peak heap bytes of one op)."""
+    fn()  # warm up lazily created frames and plans
+    gc.collect()
+    import tracemalloc
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    emu.reset_stats()
+    start_us = clock.us
+    t0 = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    elapsed = time.perf_counter() - t0
+    return elapsed * 1e6 / ops, emu.transactions / ops, (clock.us - start_us) / ops, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--ops", type=int, default=500)
+    args = parser.parse_args()
+
+    clock = VirtualClock().install()
+    emu = ADES1830Emulator(nr_of_devices=args.devices, clock=clock, noise_uv=300)
+    hal = make_hal(emu)
+    from ADES1830 import ADES1830
+    from ADES1830_DIAG import RedundancyCheck
+    from ADES1830_RING import SampleRing
+
+    ades = ADES1830(hal=hal)
+    ades.init(4.2, 2.5)
+    red = RedundancyCheck(ades)
+    red.start(continuous=True)
+    ring = SampleRing(capacity=32, nr_of_cells=len(ades.cell_map))
+    codes = ades.new_cell_array()
+    pwm = [0] * ades.nr_of_cells
+    ades.pwm_verify_interval = 0
+
+    def cycle_and_ring():
+        cycle = ades.read_cycle(mode="average")
+        ring.append(time.ticks_us(), cycle["conv_cnt"], cycle["codes"])
+
+    def pwm_step():
+        pwm[0] = (pwm[0] + 1) & 0xF
+        ades.write_pwm(pwm)
+
+    rows = (
+        ("get_cell_codes", lambda: ades.get_cell_codes(codes, mode="average")),
+        ("read_cycle", lambda: ades.read_cycle(mode="average")),
+        ("acquire_snapshot", lambda: ades.acquire_snapshot(mode="average")),
+        ("SampleRing.poll", lambda: ring.poll(ades, mode="average")),
+        ("read_cycle + append", cycle_and_ring),
+        ("RedundancyCheck.update", red.update),
+        ("write_pwm (1 cell)", pwm_step),
+        ("get_conversion_counter", ades.get_conversion_counter),
+    )
+    print(f"{sys.implementation.name}, {args.devices} device(s), {args.ops} ops")
+    print(f"{'operation':<24}{'us/op':>9}{'trans/op':>10}{'trans/s':>10}{'bus us/op':>11}{'peak B':>9}")
+    for name, fn in rows:
+        us, trans, bus_us, peak = measure(fn, args.ops, emu, clock)
+        print(f"{name:<24}{us:>9.1f}{trans:>10.1f}{trans * 1e6 / us:>10.0f}{bus_us:>11.0f}{peak:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Boot and calibration cost of the max slave's 12 ADS1118 instances.
+
+Compares one CalibrationStore shared by all instances (the default) with a
+store per instance, which parses the calibration file once per converter
+like the driver used to. The calibration session calibrates all 34
+channels and either saves after every channel, as calibrate() does by
+default, or once at the end. A last check reboots with changed
+constructor gains and clears the calibration again.
+Converters run on the host-side emulator with a virtual clock, so the
+reported times are the file and Python overhead only.
+
+    python tools/bench_ads1118_boot.py [--boots 20]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from ads1118_emu import ADS1118Bus, ADS1118Device, SLAVE_MUX, SLAVE_MUX_2, empty_cal_file, install_host_modules
+from ades1830_emu import VirtualClock
+
+OUTPUTS = (0x1, 0x2, 0x3, 0x4, 0x5, 0x6, 0xF, 0xE, 0xD, 0xC, 0xB, 0x0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--boots", type=int, default=20)
+    args = parser.parse_args()
+
+    install_host_modules()
+    clock = VirtualClock().install()
+    from lib.ADS1118 import ADS1118, CalibrationStore
+
+    devices = {}
+    for n, output in enumerate(OUTPUTS):
+        device = ADS1118Device(clock)
+        device.inputs = {code: 0.0002 * (n + 1) for code in SLAVE_MUX.values()}  # shorted inputs, small offset
+        devices[output] = device
+    bus = ADS1118Bus(devices, clock)
+    cal_file = empty_cal_file()
+    with open(cal_file, "w") as f:
+        json.dump({str(output): {"offset": [n, -n, 2 * n][:2 if n % 6 == 5 else 3],
+                                 "gain": [1.0, 1.001, 0.999][:2 if n % 6 == 5 else 3]}
+                   for n, output in enumerate(OUTPUTS)}, f)
+
+    def boot(per_instance):
+        CalibrationStore._shared.clear()
+        adcs = []
+        for n, output in enumerate(OUTPUTS):
+            mux = SLAVE_MUX_2 if n % 6 == 5 else SLAVE_MUX
+            store = CalibrationStore(cal_file) if per_instance else None
+            adcs.append(ADS1118(spi=bus, demux=bus, demux_output=output, channel_mux=mux,
+                                gain=[1.0] * len(mux), drdy=bus.drdy, cal_file=cal_file, cal_store=store))
+        return adcs
+
+    print(f"{'':<28}{'ms':>8}{'file loads':>12}{'file saves':>12}")
+    for name, per_instance in (("boot, store per instance", True), ("boot, shared store", False)):
+        t0 = time.perf_counter()
+        for _ in range(args.boots):
+            adcs = boot(per_instance)
+        ms = (time.perf_counter() - t0) * 1e3 / args.boots
+        loads = sum(store.loads for store in {id(adc.cal_store): adc.cal_store for adc in adcs}.values())
+        if adcs[1].offset[1] != -1 or abs(adcs[2].gain[2] - 0.999) > 1e-6:
+            raise AssertionError("calibration not loaded")
+        print(f"{name:<28}{ms:>8.2f}{loads:>12}{0:>12}")
+
+    for name, each in (("calibrate, save per channel", True), ("calibrate, one batch save", False)):
+        adcs = boot(False)
+
+        async def session():
+            for adc in adcs:
+                for ch in range(adc.nr_of_ch):
+                    await adc.calibrate(ch, save=each)
+            if not each:
+                adcs[0].cal_store.save()
+
+        t0 = time.perf_counter()
+        asyncio.run(session())
+        ms = (time.perf_counter() - t0) * 1e3
+        saves = adcs[0].cal_store.saves
+        with open(cal_file) as f:
+            stored = json.load(f)
+        if stored[str(OUTPUTS[3])]["offset"][0] != round(0.0008 * 32768 / 2.048):
+            raise AssertionError("calibration not saved")
+        print(f"{name:<28}{ms:>8.2f}{0:>12}{saves:>12}")
+
+    # constructor gains win unless set_gain() stored one, clearing drops the entry
+    CalibrationStore._shared.clear()
+    cal_file = empty_cal_file()
+
+    def make(gain):
+        return ADS1118(spi=bus, demux=bus, demux_output=OUTPUTS[0], channel_mux=SLAVE_MUX,
+                       gain=gain, drdy=bus.drdy, cal_file=cal_file)
+
+    adc = make([1.0, 1.0, 1.0])
+    asyncio.run(adc.calibrate(0, save=False))
+    adc.set_gain(1, 1.002)
+    adc.cal_store.save()
+    CalibrationStore._shared.clear()
+    adc = make([1.5, 1.0, 1.0])
+    if adc.offset[0] == 0 or abs(adc.gain[0] - 1.5) > 1e-6 or abs(adc.gain[1] - 1.002) > 1e-6:
+        raise AssertionError(f"gains {list(adc.gain)} after reboot with new constructor gains")
+    adc.clear_calibration()
+    with open(cal_file) as f:
+        if str(OUTPUTS[0]) in json.load(f) or abs(adc.gain[1] - 1.0) > 1e-6:
+            raise AssertionError("cleared calibration still stored")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Cost of one ADS1118 conversion on the driver side.
+
+Times and measures the peak heap of the per-conversion work against a null SPI
+bus: the precomputed path (ready config words, fixed RX buffer, per
+channel scale) used by the driver and scanner, and a reference of the
+previous path that built the config word, allocated both transfer buffers
+and derived the LSB on every conversion. The peak heap column includes the
+float result and intermediate ints, which both paths allocate.
+
+    python tools/bench_ads1118_hotpath.py [--ops 20000]
+"""
+import argparse
+import time
+import tracemalloc
+
+from ads1118_emu import empty_cal_file, install_host_modules
+
+
+class NullBus:
+    """SPI and demux that do nothing and always return the same result."""
+
+    def select(self, output):
+        pass
+
+    def deselect(self):
+        pass
+
+    def write_readinto(self, tx, rx):
+        rx[0] = 0x1E
+        rx[1] = 0x84
+
+
+def legacy_conversion(adc, ch):
+    config = adc._build_config(1, adc.channel_mux[ch], 0)
+    adc._select()
+    conf_bytes = bytearray([(config >> 8) & 0xFF, config & 0xFF])
+    read_bytes = bytearray(2)
+    adc.spi.write_readinto(conf_bytes, read_bytes)
+    adc._deselect()
+    raw = (read_bytes[0] << 8) | read_bytes[1]
+    signed = (False if adc.channel_mux[ch] >= 4 else True)
+    return (adc._get_value(raw, signed) - adc.offset[ch]) * adc._get_lsb(signed)
+
+
+def fast_conversion(adc, ch):
+    return adc.raw_to_voltage(ch, adc._transfer(adc._start_words[ch]))
+
+
+def measure(fn, adc, ops):
+    for ch in range(adc.nr_of_ch):
+        fn(adc, ch)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    fn(adc, 0)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    t0 = time.perf_counter()
+    for i in range(ops):
+        fn(adc, i % 3)
+    return (time.perf_counter() - t0) * 1e6 / ops, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ops", type=int, default=20000)
+    args = parser.parse_args()
+
+    install_host_modules()
+    from lib.ADS1118 import ADS1118
+
+    bus = NullBus()
+    adc = ADS1118(spi=bus, demux=bus, demux_output=1, channel_mux={0: 0b000, 1: 0b010, 2: 0b011},
+                  gain=[1.0, 1.0, 1.0], cal_file=empty_cal_file())
+    if abs(legacy_conversion(adc, 1) - fast_conversion(adc, 1)) > 1e-6:
+        raise AssertionError("precomputed conversion differs from the reference")
+    print(f"{'path':<14}{'us/conv':>9}{'peak B':>9}")
+    for name, fn in (("legacy", legacy_conversion), ("precomputed", fast_conversion)):
+        us, peak = measure(fn, adc, args.ops)
+        print(f"{name:<14}{us:>9.2f}{peak:>9}")
+
+
+if __name__ == "__main__":
+    main()
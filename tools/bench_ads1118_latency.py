@@ -0,0 +1,101 @@
+"""
+Read latency of ADS1118.read_voltage() per conversion mode and data rate.
+
+Runs one ADS1118 against the host-side converter emulator with a virtual
+clock and reports the latency_stats() of the driver for:
+
+    fixed     single-shot, fixed 1/SPS + 10 ms delay (no DRDY pin)
+    single    single-shot, DOUT/DRDY polling
+    cont      continuous, DOUT/DRDY polling, reading one input
+    cont-alt  continuous, DOUT/DRDY polling, alternating two inputs
+
+Reads are issued every --period-ms, like a monitoring loop. Continuous
+mode then finds most results already converted. The alternating case is
+the master pack/inverter pattern: every input change costs a discarded
+conversion, single-shot with DRDY is the better choice there.
+A last check holds DRDY high: reads must fall back to the fixed delay.
+
+    python tools/bench_ads1118_latency.py [--reads 200] [--period-ms 25]
+"""
+import argparse
+import asyncio
+
+from ads1118_emu import ADS1118Bus, ADS1118Device, empty_cal_file, install_host_modules
+from ades1830_emu import VirtualClock
+
+RATES = (4, 6, 7)  # 128, 475, 860 SPS
+CASES = (
+    ("fixed", "single", False, False),
+    ("single", "single", True, False),
+    ("cont", "continuous", True, False),
+    ("cont-alt", "continuous", True, True),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--period-ms", type=int, default=25)
+    args = parser.parse_args()
+
+    install_host_modules()
+    clock = VirtualClock().install()
+
+    async def virtual_sleep(seconds):
+        clock.advance(int(seconds * 1e6))
+        await asyncio.sleep_ms(0)
+
+    from lib.ADS1118 import ADS1118
+    import lib.ADS1118 as driver
+    driver.asyncio = type("asyncio", (), {
+        "sleep": staticmethod(virtual_sleep),
+        "sleep_ms": staticmethod(asyncio.sleep_ms),
+        "TimeoutError": asyncio.TimeoutError,
+    })
+
+    cal_file = empty_cal_file()
+    print(f"{'case':<10}{'SPS':>6}{'avg us':>9}{'min us':>9}{'max us':>9}{'polls/read':>12}")
+    for dr in RATES:
+        for name, mode, drdy, alternate in CASES:
+            device = ADS1118Device(clock, osc_error=0.03)
+            device.inputs = {0b000: 1.2, 0b011: 0.8}
+            bus = ADS1118Bus({0: device}, clock)
+            adc = ADS1118(spi=bus, demux=bus, demux_output=0, dr=dr, mode=mode,
+                          drdy=bus.drdy if drdy else None,
+                          channel_mux={0: 0b000, 1: 0b011}, gain=[1.0, 1.0],
+                          cal_file=cal_file)
+
+            async def run():
+                for i in range(args.reads):
+                    channel = i & 1 if alternate else 0
+                    volts = await adc.read_voltage(channel)
+                    expected = device.inputs[adc.channel_mux[channel]]
+                    if abs(volts - expected) > 0.001:
+                        raise AssertionError(f"{name} at dr={dr}: read {volts:.4f} V, expected {expected} V")
+                    await asyncio.sleep_ms(args.period_ms)
+
+            asyncio.run(run())
+            st = adc.latency_stats()
+            print(f"{name:<10}{st['sps']:>6}{st['avg_us']:>9}{st['min_us']:>9}{st['max_us']:>9}"
+                  f"{st['polls'] / st['reads']:>12.1f}")
+
+    class StuckPin:
+        """DRDY that never goes low, e.g. a broken MISO pull-up."""
+
+        def value(self):
+            clock.advance(20)
+            return 1
+
+    device = ADS1118Device(clock)
+    device.inputs = {0b000: 1.2}
+    bus = ADS1118Bus({0: device}, clock)
+    adc = ADS1118(spi=bus, demux=bus, demux_output=0, drdy=StuckPin(), channel_mux={0: 0b000},
+                  gain=[1.0], cal_file=cal_file)
+    volts = asyncio.run(adc.read_voltage(0))
+    if abs(volts - 1.2) > 0.001 or adc.latency_stats()["drdy_timeouts"] != 1:
+        raise AssertionError(f"stuck DRDY: read {volts:.4f} V, {adc.latency_stats()['drdy_timeouts']} timeouts")
+    print(f"stuck DRDY: fell back to the fixed delay, {adc.latency_stats()['avg_us']} us")
+
+
+if __name__ == "__main__":
+    main()
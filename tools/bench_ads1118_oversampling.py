@@ -0,0 +1,73 @@
+"""
+Noise against latency of ADS1118 oversampling settings on the max slave.
+
+Scans the 12 emulated converters with white noise and occasional spikes
+on every input and reports, per data rate and decimation setting, the
+measured RMS noise and worst error of the results, the sweep time of the
+scanner and what ADS1118.oversampling_info() predicts.
+
+    python tools/bench_ads1118_oversampling.py [--sweeps 200] [--noise-uv 400]
+"""
+import argparse
+import asyncio
+import math
+
+from ads1118_emu import make_slave
+
+# (dr, conversions per result, median of 3)
+SETTINGS = (
+    (4, 1, False),
+    (5, 2, False),
+    (6, 3, False),
+    (6, 3, True),
+    (7, 6, False),
+    (7, 6, True),
+    (7, 9, True),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sweeps", type=int, default=200)
+    parser.add_argument("--noise-uv", type=float, default=400.0)
+    parser.add_argument("--spike-rate", type=float, default=0.005)
+    parser.add_argument("--spike-mv", type=float, default=20.0)
+    args = parser.parse_args()
+
+    print(f"{'SPS':>5}{'n':>4}{'med':>5}{'rms uV':>9}{'max uV':>9}{'sweep ms':>10}"
+          f"{'pred. uV':>10}{'enob':>7}{'latency ms':>12}")
+    for dr, n, median in SETTINGS:
+        clock, bus, adcs, expected = make_slave(dr=dr, noise_uv=args.noise_uv,
+                                                spike_rate=args.spike_rate, spike_mv=args.spike_mv)
+        from lib.ADS1118 import ADS1118Scanner
+
+        for adc in adcs:
+            for ch in range(adc.nr_of_ch):
+                adc.set_oversampling(ch, n, median)
+        scanner = ADS1118Scanner(adcs)
+        sq = 0.0
+        worst = 0.0
+        count = 0
+
+        async def run():
+            nonlocal sq, worst, count
+            await scanner.sweep()
+            start = clock.us
+            for _ in range(args.sweeps):
+                volts = await scanner.sweep()
+                for i, v in enumerate(volts):
+                    err = abs(v - expected[i]) * 1e6
+                    sq += err * err
+                    worst = max(worst, err)
+                    count += 1
+            return (clock.us - start) / args.sweeps
+
+        sweep_us = asyncio.run(run())
+        info = adcs[0].oversampling_info(0)
+        predicted = args.noise_uv / math.sqrt(n * 0.742 if median else n)
+        print(f"{info['sps']:>5}{n:>4}{'yes' if median else 'no':>5}{math.sqrt(sq / count):>9.0f}{worst:>9.0f}"
+              f"{sweep_us / 1000:>10.1f}{predicted:>10.0f}{info['enob']:>7.1f}{info['latency_ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
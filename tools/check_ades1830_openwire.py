@@ -0,0 +1,85 @@
+"""
+Host check of the ADES1830 open-wire scheduler against simulated broken taps.
+
+The pack is a tools/ades1830_emu.py chain at 3.7 V per cell, a cell whose
+tap is marked broken collapses on the S-ADC while its channel is pulled down
+by an ADSV open-wire phase. The scheduler runs on the emulator's virtual
+clock with a realistic per-cycle spend and must flag exactly the broken
+cells without exceeding its latency budget.
+
+With --redundant the C-ADC runs a redundant continuous ADCV as in
+src/slave/main3.py, the scheduler suspends RedundancyCheck for every phase
+and resumes it afterwards; the cross-check must stay clean in between.
+With --unpopulated the given channels are left floating (they collapse
+under pull-down like a broken tap) and removed from the cell map, they
+must never be flagged and verdicts use logical cell indices.
+
+    python tools/check_ades1830_openwire.py [--devices 2] [--broken 3,18] [--redundant] [--unpopulated 15,31]
+"""
+import argparse
+
+from ades1830_emu import ADES1830Emulator, VirtualClock, make_hal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=2)
+    parser.add_argument("--broken", default="3,18", help="0-based channels behind a broken tap")
+    parser.add_argument("--unpopulated", default="", help="0-based channels without a cell")
+    parser.add_argument("--cycles", type=int, default=200)
+    parser.add_argument("--spend-us", type=int, default=2500, help="time the normal measurement takes per cycle")
+    parser.add_argument("--redundant", action="store_true", help="run RedundancyCheck alongside, like main3")
+    args = parser.parse_args()
+    broken = [int(c) for c in args.broken.split(",") if c]
+    unpopulated = [int(c) for c in args.unpopulated.split(",") if c]
+
+    clock = VirtualClock().install()
+    emu = ADES1830Emulator(nr_of_devices=args.devices, clock=clock)
+    for cell in broken + unpopulated:
+        emu.devices[cell // 16].broken_taps.add(cell % 16)
+    hal = make_hal(emu)
+    from ADES1830 import ADES1830
+    from ADES1830_DIAG import OpenWireScheduler, RedundancyCheck
+
+    ades = ADES1830(hal=hal)
+    ades.set_cell_map([ch for ch in range(ades.nr_of_cells) if ch not in unpopulated])
+    expected = sorted(ades.cell_map.index(ch) for ch in broken)
+    if args.redundant:
+        red = RedundancyCheck(ades, limit_mv=10)
+        red.start(continuous=True)
+        ow = OpenWireScheduler(ades, interval_ms=500, budget_us=5000, limit_mv=400, confirm=2,
+                               suspend=red.stop, resume=lambda: red.start(continuous=True))
+    else:
+        red = None
+        ades.start_cell_volt_conv(continuous=True)
+        ow = OpenWireScheduler(ades, interval_ms=500, budget_us=5000, limit_mv=400, confirm=2)
+
+    cycle_spend_us = args.spend_us  # normal measurement share of each cycle
+    for _ in range(args.cycles):
+        clock.us += cycle_spend_us
+        if red is not None and not ow.busy and red.update():
+            raise AssertionError(f"C-ADC/S-ADC mismatch on cells {red.faulty_cells()}")
+        ow.step(spent_us=cycle_spend_us)
+        if cycle_spend_us + ow.last_step_us > ow.budget_us:
+            raise AssertionError("scheduler exceeded its latency budget")
+        clock.us += 100000 - cycle_spend_us
+
+    found = ow.open_cells()
+    print(f"phases {ow.phases_done}, skipped {ow.skipped}, timeouts {ow.timeouts}, worst step {ow.step_us} us")
+    print(f"open wire on cells {found}, expected {expected}")
+    for cell, is_open, ticks in ow.verdicts():
+        if is_open:
+            print(f"  cell {cell} open, last checked at {ticks} ms")
+    if ow.timeouts:
+        raise AssertionError(f"{ow.timeouts} open-wire phases timed out")
+    if red is not None:
+        print(f"redundancy check: {red.samples} samples, worst delta {max(red.max_abs) * 0.15:.2f} mV")
+    if found != expected:
+        raise AssertionError("open-wire verdicts do not match the simulated taps")
+    if len(ow.verdicts()) != len(ades.cell_map):
+        raise AssertionError("not every cell received a verdict")
+    print("open-wire check passed")
+
+
+if __name__ == "__main__":
+    main()
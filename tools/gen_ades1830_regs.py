@@ -0,0 +1,94 @@
+"""
+Compile the ADES1830 registers.json into a plain Python module.
+
+The generated ADES1830_REGDEF.py holds one REGISTER subclass per register
+with explicit getter/setter methods, so the ESP32 does not parse JSON or
+validate field overlaps at boot. Validation runs here, on the host, through
+the same code the runtime JSON path uses.
+
+    python tools/gen_ades1830_regs.py          # (re)generate the module
+    python tools/gen_ades1830_regs.py --check  # fail if it is out of date
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ADES_DIR = Path(__file__).resolve().parent.parent / "src" / "lib" / "ades1830"
+JSON_FILE = ADES_DIR / "registers.json"
+OUT_FILE = ADES_DIR / "ADES1830_REGDEF.py"
+
+HEADER = """\
+# ADES1830_REGDEF.py
+# Generated by tools/gen_ades1830_regs.py from registers.json, do not edit.
+from ADES1830_REG import REGISTER
+"""
+
+
+def fmt_addr(address):
+    return "None" if address is None else f"0x{address:04X}"
+
+
+def generate(configs):
+    from ADES1830_REG import create_register_class, parse_register_config
+
+    out = [HEADER]
+    names = []
+    for config in configs:
+        kwargs = parse_register_config(config)
+        cls = create_register_class(**kwargs)  # validates widths, defaults and overlaps
+        name = kwargs["name"]
+        writable = not kwargs["is_read_only"] and kwargs["write_address"] is not None
+        names.append(name)
+        out.append("")
+        out.append(f"class {name}(REGISTER):")
+        out.append("    FIELDS = (")
+        for field_name, bit_start, width in cls.FIELDS:
+            out.append(f'        ("{field_name}", {bit_start}, {width}),')
+        out.append("    )")
+        out.append("")
+        out.append("    def __init__(self, hal=None, shadow=False):")
+        out.append(
+            f'        super().__init__({fmt_addr(kwargs["read_address"])}, {fmt_addr(kwargs["write_address"])}, '
+            f'"{name}", {kwargs["is_read_only"]}, hal, {kwargs["volatile"]}, shadow)'
+        )
+        out.append(f"        self.value = 0x{cls().value:012X}")
+        for field_name, bit_start, width in cls.FIELDS:
+            out.append("")
+            out.append(f"    def get_{field_name}(self):")
+            out.append(f"        return self.get_bits({bit_start}, {width})")
+            if writable:
+                out.append("")
+                out.append(f"    def set_{field_name}(self, value):")
+                out.append(f"        self.set_bits({bit_start}, {width}, value)")
+        out.append("")
+    out.append("")
+    out.append("REGISTERS = {")
+    for name in names:
+        out.append(f'    "{name}": {name},')
+    out.append("}")
+    return "\n".join(out) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="only check that the module is up to date")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ADES_DIR))
+    with open(JSON_FILE, "r") as f:
+        source = generate(json.load(f))
+
+    if args.check:
+        current = OUT_FILE.read_text() if OUT_FILE.exists() else ""
+        if current != source:
+            print(f"{OUT_FILE.name} is out of date, run tools/gen_ades1830_regs.py")
+            sys.exit(1)
+        print(f"{OUT_FILE.name} is up to date")
+        return
+    OUT_FILE.write_text(source)
+    print(f"Wrote {OUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()